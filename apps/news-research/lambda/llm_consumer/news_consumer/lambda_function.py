@@ -12,8 +12,11 @@ import logging
 from bs4 import BeautifulSoup
 import re
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 from llm_handler import GPTProcessor, ClaudeProcessor
+from response_cache import response_cache_from_env
 import json
 import pandas as pd
 import io
@@ -25,45 +28,109 @@ logger.setLevel(logging.INFO)
 s3_client = boto3.client('s3')
 lambda_client = boto3.client('lambda')
 
+# Articles in a message batch are scraped in parallel, each on its own worker with its own timeout
+SCRAPE_MAX_WORKERS = int(os.environ.get('SCRAPE_MAX_WORKERS', '10'))
+SCRAPE_TIMEOUT = 10
+
+METRICS = ["reliability", "sentiment", "relevance", "controversy", "tags"]
+# Cap on concurrent LLM calls across all articles and metrics of a batch; tune to the provider's rate limits
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '6'))
+
+# Persistent LLM response cache (DynamoDB, S3 or SQLite, from LLM_CACHE_* env vars), or None when not configured
+response_cache = response_cache_from_env()
+
+# Keep-alive session reused across articles and warm invocations, pooled for the scraping workers
+http_session = requests.Session()
+http_session.headers.update({'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36'})
+http_adapter = HTTPAdapter(pool_connections=SCRAPE_MAX_WORKERS, pool_maxsize=SCRAPE_MAX_WORKERS)
+http_session.mount('http://', http_adapter)
+http_session.mount('https://', http_adapter)
+
 
 def process_records(records, llm_processor, model_name, model_version, s3_news_output_bucket, prompt_version):
     """ Process each news record and persist results. """
     
-    metrics = ["reliability", "sentiment", "relevance", "controversy", "tags"]
+    # Scrape every article of the batch up front so slow publishers overlap instead of adding up
+    raw_news_texts = get_raw_news_texts([news_record.get('link') for news_record in records])
 
+    # The metrics each record asks for; the LLM calls for the whole batch run concurrently below
+    record_metrics = []
     for news_record in records:
         try:
-            if news_record['get_summary']:
-                metrics.insert(0, "summary") 
-            
-            results = {}
-            raw_news_text = get_raw_news_text(news_record['link'])
-                            
-            for metric in metrics:
-                if raw_news_text:
-                    results[metric] = llm_processor.process_metric(metric, raw_news_text, source=news_record.get('source', ''))
-                else:
-                    results[metric] = None
-            
-            news_record.update(results)
-            news_record.update({'model_name': model_name, 'model_version': model_version, 'raw': raw_news_text, 'prompt_version': prompt_version})
-            
-
+            metrics = (["summary"] if news_record['get_summary'] else []) + METRICS
         except Exception as e:
             logger.error(f'Error processing news record: {news_record}, error: {e}')
+            metrics = None
+        record_metrics.append(metrics)
+
+    metric_values = process_metrics(llm_processor, records, raw_news_texts, record_metrics)
+
+    for index, (news_record, raw_news_text, metrics) in enumerate(zip(records, raw_news_texts, record_metrics)):
+        if metrics is not None:
+            # Merge in metric order, whatever order the calls finished in
+            results = {metric: metric_values.get((index, metric)) for metric in metrics}
+            news_record.update(results)
+            news_record.update({'model_name': model_name, 'model_version': model_version, 'raw': raw_news_text, 'prompt_version': prompt_version})
 
         if news_record['triggered_by'] == 's3_excel':
             persist_news_analysis_parquet(news_record, s3_news_output_bucket, f"{model_name}-{model_version}")
     if records[0]['triggered_by'] == 'api_json':
         persist_news_analysis(records, s3_news_output_bucket, f"{model_name}-{model_version}")
+
+
+def process_metrics(llm_processor, records, raw_news_texts, record_metrics, max_concurrency=LLM_MAX_CONCURRENCY):
+    """
+    Run the batch's LLM calls concurrently, at most max_concurrency in flight to stay within provider
+    rate limits: one call per (record, metric), or one per record when the processor's prompt version
+    has a combined prompt. Returns a dict of (record index, metric) -> value; a failed call yields None.
+    """
+    combined = getattr(llm_processor, 'combined', False)
+    tasks = []
+    for index, metrics in enumerate(record_metrics):
+        if metrics and raw_news_texts[index]:
+            tasks.extend([(index, metrics)] if combined else [(index, [metric]) for metric in metrics])
+    if not tasks:
+        return {}
+
+    def process(task):
+        index, metrics = task
+        source = records[index].get('source', '')
+        try:
+            if combined:
+                return llm_processor.process_metrics(metrics, raw_news_texts[index], source=source)
+            return {metrics[0]: llm_processor.process_metric(metrics[0], raw_news_texts[index], source=source)}
+        except Exception as e:
+            logger.error(f'Error processing {", ".join(metrics)} for {records[index].get("link")}: {e}')
+            return {}
+
+    metric_values = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(tasks)))) as executor:
+        for (index, _), results in zip(tasks, executor.map(process, tasks)):
+            metric_values.update({(index, metric): value for metric, value in results.items()})
+    return metric_values
     
 
+def get_raw_news_texts(urls, max_workers=SCRAPE_MAX_WORKERS):
+    """ Scrape several articles concurrently on a bounded pool, returning texts (or None) in url order. """
+    if not urls:
+        return []
+
+    def scrape(url):
+        try:
+            return get_raw_news_text(url)
+        except Exception as e:  # one broken page must not fail the rest of the batch
+            logger.error(f'Error parsing news text from {url}: {e}')
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        return list(executor.map(scrape, urls))
+
+
 # Get the news from the url and strip out all html returning raw text
 def get_raw_news_text(url : str) -> str: # throws http error if problems w/request
    # Send a GET request to the URL
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_session.get(url, timeout=SCRAPE_TIMEOUT)
         response.raise_for_status()  # Raise an exception if there was an error
         
         # Parse the HTML content using BeautifulSoup
@@ -153,9 +220,9 @@ def persist_news_analysis_parquet(news_record, s3_news_output_bucket, model_hand
 
 def initialize_llm_processor(model_name, model_handle, s3_news_prompts_bucket, prompt_version):
     if model_name.lower() == 'openai':
-        return GPTProcessor(model_handle, s3_news_prompts_bucket, prompt_version)
+        return GPTProcessor(model_handle, s3_news_prompts_bucket, prompt_version, response_cache)
     elif model_name.lower() == 'anthropic.claude':
-        return ClaudeProcessor(model_handle, s3_news_prompts_bucket, prompt_version)
+        return ClaudeProcessor(model_handle, s3_news_prompts_bucket, prompt_version, response_cache)
     else:
         raise ValueError(f'Unsupported LLM type: {model_name}') 
 
@@ -176,5 +243,7 @@ def handler(event, context):
         
         process_records(message_body['news_items'], llm_processor, model_name, model_version, s3_news_output_bucket, prompt_version)
         
+    if response_cache is not None:
+        logger.info(f"LLM response cache: {response_cache.stats}")
 
     return {'status': 'Processing complete'}
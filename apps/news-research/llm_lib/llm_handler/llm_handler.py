@@ -1,11 +1,17 @@
 import boto3
 import json
+import os
 import re
 import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from string import Formatter
 from botocore.exceptions import ClientError
 from langchain_openai import ChatOpenAI
 from langchain.chains import LLMChain
 from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
+from response_cache import ResponseCache
 import boto3
 import json
 import logging
@@ -14,40 +20,278 @@ from botocore.exceptions import ClientError
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def load_prompts_from_s3(version, s3_news_prompts_bucket):
+# Seconds before a cached prompt bundle is revalidated against S3 by ETag; 0 keeps it for the container's lifetime
+PROMPT_CACHE_TTL = float(os.environ.get('PROMPT_CACHE_TTL', '0'))
+
+s3_client = boto3.client('s3')
+
+# Parsed prompt bundles per (bucket, version), shared by every processor in the container
+_prompt_cache = {}
+_prompt_cache_lock = threading.Lock()
+
+
+class PromptTemplate:
     """
-    Access prompt json file from S3 bucket
+    A prompt template parsed once, so rendering is a plain string join.
+    Supports the {name} placeholders and {{ }} escapes of str.format.
     """
-    s3 = boto3.client('s3')
-    file_key = f'{version}/prompts.json'
+    def __init__(self, template):
+        self.template = template
+        self._parts = [(literal, field_name) for literal, field_name, _, _ in Formatter().parse(template)]
+
+    def render(self, **values):
+        return "".join(literal + (str(values[field_name]) if field_name is not None else "")
+                       for literal, field_name in self._parts)
 
+
+def _fetch_prompt_bundle(version, s3_news_prompts_bucket, etag=None):
+    """
+    Get the prompt json file from S3, conditionally on the ETag of a cached copy.
+    Returns:
+        (prompts, etag), or None if the cached copy is still current.
+    """
+    kwargs = {'Bucket': s3_news_prompts_bucket, 'Key': f'{version}/prompts.json'}
+    if etag:
+        kwargs['IfNoneMatch'] = etag
     try:
-        response = s3.get_object(Bucket=s3_news_prompts_bucket, Key=file_key)
-        prompts = json.loads(response['Body'].read())
-        return prompts
+        response = s3_client.get_object(**kwargs)
     except ClientError as e:
-        logger.error(f'Error fetching prompts from S3: {e}')
-        return {}
-    except Exception as e:
-        logger.error(f'Error loading prompts: {e}')
-        return {}
+        if e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+            return None
+        raise
+    return json.loads(response['Body'].read()), response.get('ETag')
+
+
+def get_prompt_templates(version, s3_news_prompts_bucket, ttl=None):
+    """
+    Prompt templates of a version, loaded from S3 once per container and kept in memory.
+    With a ttl (default PROMPT_CACHE_TTL) the bundle is revalidated by ETag once it is older than ttl seconds.
+    Returns:
+        dict: prompt name -> PromptTemplate, or an empty dict if the prompts cannot be loaded.
+    """
+    ttl = PROMPT_CACHE_TTL if ttl is None else ttl
+    key = (s3_news_prompts_bucket, version)
+    with _prompt_cache_lock:
+        entry = _prompt_cache.get(key)
+        if entry is not None and (not ttl or time.monotonic() - entry['loaded_at'] < ttl):
+            return entry['templates']
+
+        try:
+            bundle = _fetch_prompt_bundle(version, s3_news_prompts_bucket, entry['etag'] if entry else None)
+        except Exception as e:
+            logger.error(f'Error fetching prompts from S3: {e}')
+            if entry is None:
+                return {}
+            # Keep serving the stale copy until the next refresh rather than failing every metric
+            entry['loaded_at'] = time.monotonic()
+            return entry['templates']
+
+        if bundle is None:
+            entry['loaded_at'] = time.monotonic()
+        else:
+            prompts, etag = bundle
+            templates = {name: PromptTemplate(template) for name, template in prompts.items() if isinstance(template, str)}
+            entry = {'prompts': prompts, 'templates': templates, 'etag': etag, 'loaded_at': time.monotonic()}
+            _prompt_cache[key] = entry
+        return entry['templates']
+
+
+def load_prompts_from_s3(version, s3_news_prompts_bucket):
+    """
+    Access prompt json file from S3 bucket, through the in-memory prompt cache
+    """
+    get_prompt_templates(version, s3_news_prompts_bucket)
+    entry = _prompt_cache.get((s3_news_prompts_bucket, version))
+    return entry['prompts'] if entry else {}
+
 
 def get_prompt_by_metric(metric_name, content, source, version, s3_news_prompts_bucket):
     if content is None:
         return None
 
-    prompts = load_prompts_from_s3(version, s3_news_prompts_bucket)
-
-    prompt_template = prompts.get(metric_name, "")
-    prompt = prompt_template.format(content=content, source=source if source else "")
+    prompt_template = get_prompt_templates(version, s3_news_prompts_bucket).get(metric_name)
+    if prompt_template is None:
+        return ""
+    prompt = prompt_template.render(content=content, source=source if source else "")
     
     return prompt
 
 
-class ClaudeProcessor:
-    def __init__(self, model_handle, s3_news_prompts_bucket, prompt_version):
-        self.bedrock = boto3.client(service_name='bedrock-runtime', region_name='us-west-2')
+# Prompt key of the single-call mode: prompt versions defining it get every metric from one JSON response
+COMBINED_PROMPT = "combined"
+SCORE_METRICS = ["reliability", "sentiment", "relevance", "controversy"]
+
+
+def validate_metric(metric_name, value):
+    """
+    Check a metric from a combined response against its schema: scores are integers from 1-5,
+    the summary a non-empty string and tags a list of strings.
+    Returns:
+        The normalized value. Raises ValueError if it does not match the schema.
+    """
+    if metric_name in SCORE_METRICS:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) or not 1 <= value <= 5:
+            raise ValueError(f"{metric_name} must be an integer from 1-5, got {value!r}")
+        return int(value)
+    elif metric_name == "summary":
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"summary must be a non-empty string, got {value!r}")
+        return value.strip()
+    elif metric_name == "tags":
+        if not isinstance(value, list) or not value or not all(isinstance(tag, str) for tag in value):
+            raise ValueError(f"tags must be a list of strings, got {value!r}")
+        return [tag.strip() for tag in value]
+    raise ValueError(f"Unsupported metric: {metric_name}")
+
+
+def normalize_metric(metric_name, value):
+    """
+    Coerce a per-metric fallback value in combined mode to the types of a validated combined response:
+    integer scores from 1-5, a stripped summary string and a list of tag strings.
+    Returns:
+        The normalized value, or None if it cannot be coerced.
+    """
+    if value is None:
+        return None
+    try:
+        return validate_metric(metric_name, value)
+    except ValueError:
+        pass
+    try:
+        if metric_name in SCORE_METRICS and isinstance(value, (str, float)):
+            # Raw completions such as "4", "4.0" or "Score: 4"
+            if isinstance(value, str):
+                match = re.search(r'\d+(\.\d+)?', value)
+                if match is None:
+                    raise ValueError(f"no score in {value!r}")
+                value = float(match.group())
+            return validate_metric(metric_name, round(value))
+        if metric_name == "tags" and isinstance(value, str):
+            return validate_metric(metric_name, [tag for tag in value.split(",") if tag.strip()])
+    except ValueError as e:
+        logger.warning(f"Invalid {metric_name} from model: {e}")
+    return None
+
+
+def parse_combined_response(completion, metrics):
+    """
+    Extract the JSON object from a combined completion and validate each requested metric.
+    Returns:
+        dict: metric -> normalized value for the metrics that passed validation.
+    """
+    start, end = completion.find("{"), completion.rfind("}")
+    if start == -1 or end < start:
+        logger.error(f"No JSON object in combined response: {completion}")
+        return {}
+    try:
+        response = json.loads(completion[start:end + 1])
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in combined response: {e}")
+        return {}
+    if not isinstance(response, dict):
+        logger.error(f"Combined response is not a JSON object: {response}")
+        return {}
+
+    results = {}
+    for metric_name in metrics:
+        try:
+            results[metric_name] = validate_metric(metric_name, response.get(metric_name))
+        except ValueError as e:
+            logger.warning(f"Invalid {metric_name} in combined response: {e}")
+    return results
+
+
+class BaseProcessor(ABC):
+    """
+    Shared metric processing. When the prompt version defines a combined prompt, `process_metrics`
+    gets every metric of an article from a single model call and falls back to per-metric calls
+    only for fields that fail validation. With a response cache, metrics already computed for the
+    same model, prompt version, content and source are served from it instead of the model.
+    In combined mode, fallback values are normalized by `normalize_metric`, so each article's
+    values have the types of a combined response. Per-metric prompt versions return the model's
+    values unchanged, keeping the column types of the output they already persist.
+    """
+    def __init__(self, model_handle, s3_news_prompts_bucket, prompt_version, response_cache=None):
         self.model_id = model_handle
+        self.s3_news_prompts_bucket = s3_news_prompts_bucket
+        self.version = prompt_version
+        self.response_cache = response_cache
+        # Loading the templates here warms the prompt cache before the first article
+        self.combined = COMBINED_PROMPT in get_prompt_templates(prompt_version, s3_news_prompts_bucket)
+
+    @abstractmethod
+    def complete(self, prompt):
+        """Send a fully rendered prompt to the model and return the completion text."""
+
+    @abstractmethod
+    def _process_metric(self, metric_name, content, source=None):
+        """Process one metric with its own prompt, returning the model's value or None on failure."""
+
+    def _normalize(self, metric_name, value):
+        return normalize_metric(metric_name, value) if self.combined else value
+
+    def _cache_key(self, metric_name, content, source):
+        return ResponseCache.make_key(self.model_id, self.version, metric_name, content, source)
+
+    def process_metric(self, metric_name, content, source=None):
+        """
+        Process content based on the metric, through the response cache when one is configured.
+        Returns:
+            int or str or list or None: The processed value, or None on failure.
+        """
+        if content is None or self.response_cache is None:
+            return self._normalize(metric_name, self._process_metric(metric_name, content, source=source))
+
+        cache_key = self._cache_key(metric_name, content, source)
+        hit, value = self.response_cache.get(cache_key)
+        if hit:
+            return self._normalize(metric_name, value)
+        value = self._normalize(metric_name, self._process_metric(metric_name, content, source=source))
+        self.response_cache.put(cache_key, value)
+        return value
+
+    def process_metrics(self, metrics, content, source=None):
+        """
+        Process several metrics for one article.
+        Returns:
+            dict: metric -> processed value, or None for a metric that failed.
+        """
+        if content is None:
+            return {metric_name: None for metric_name in metrics}
+
+        results = {}
+        if self.response_cache is not None:
+            for metric_name in metrics:
+                hit, value = self.response_cache.get(self._cache_key(metric_name, content, source))
+                if hit:
+                    results[metric_name] = self._normalize(metric_name, value)
+        pending = [metric_name for metric_name in metrics if metric_name not in results]
+
+        computed = {}
+        if self.combined and pending:
+            try:
+                templates = get_prompt_templates(self.version, self.s3_news_prompts_bucket)
+                prompt = templates[COMBINED_PROMPT].render(metrics=", ".join(pending), content=content,
+                                                           source=source if source else "")
+                computed = parse_combined_response(self.complete(prompt), pending)
+            except Exception as e:
+                logger.error(f"Error processing combined metrics: {e}")
+
+        # Per-metric calls for whatever the combined response did not provide
+        for metric_name in pending:
+            if metric_name not in computed:
+                computed[metric_name] = self._normalize(metric_name,
+                                                        self._process_metric(metric_name, content, source=source))
+            if self.response_cache is not None:
+                self.response_cache.put(self._cache_key(metric_name, content, source), computed[metric_name])
+        results.update(computed)
+        return {metric_name: results[metric_name] for metric_name in metrics}
+
+
+class ClaudeProcessor(BaseProcessor):
+    def __init__(self, model_handle, s3_news_prompts_bucket, prompt_version, response_cache=None):
+        super().__init__(model_handle, s3_news_prompts_bucket, prompt_version, response_cache)
+        self.bedrock = boto3.client(service_name='bedrock-runtime', region_name='us-west-2')
         self.accept = 'application/json'
         self.content_type = 'application/json'
         self.base_body = {
@@ -55,8 +299,6 @@ class ClaudeProcessor:
             "temperature": 0.1,
             "top_p": 0.9,
         }
-        self.s3_news_prompts_bucket = s3_news_prompts_bucket
-        self.version = prompt_version
 
     def clean_phrase(self, text):
         """
@@ -83,7 +325,14 @@ class ClaudeProcessor:
         
         return cleaned_text
 
-    def process_metric(self, metric_name, content, source=None):
+    def complete(self, prompt):
+        # Build a fresh body per call; metrics are processed concurrently on one processor
+        body = json.dumps({**self.base_body, "prompt": f"\n\nHuman:{prompt}\n\nAssistant:"})
+        response = self.bedrock.invoke_model(body=body, modelId=self.model_id, accept=self.accept, contentType=self.content_type)
+        response_body = json.loads(response.get('body').read())
+        return response_body.get('completion')
+
+    def _process_metric(self, metric_name, content, source=None):
         """
         Process content based on the metric using Claude model on AWS Bedrock.
         Returns:
@@ -94,12 +343,7 @@ class ClaudeProcessor:
 
         try:
             prompt = get_prompt_by_metric(metric_name, content, source, self.version, self.s3_news_prompts_bucket)
-            self.base_body["prompt"] = f"\n\nHuman:{prompt}\nraw text:{prompt}\n\nAssistant:"
-
-            body = json.dumps(self.base_body)
-            response = self.bedrock.invoke_model(body=body, modelId=self.model_id, accept=self.accept, contentType=self.content_type)
-            response_body = json.loads(response.get('body').read())
-            completion = response_body.get('completion')
+            completion = self.complete(f"{prompt}\nraw text:{prompt}")
 
             # Process the completion based on the metric
             if metric_name in ["reliability", "sentiment", "relevance", "controversy"]:
@@ -126,11 +370,10 @@ class ClaudeProcessor:
 
 
 
-class GPTProcessor:
-    def __init__(self, model_handle, s3_news_prompts_bucket, prompt_version):
+class GPTProcessor(BaseProcessor):
+    def __init__(self, model_handle, s3_news_prompts_bucket, prompt_version, response_cache=None):
+        super().__init__(model_handle, s3_news_prompts_bucket, prompt_version, response_cache)
         self.llm = self.init_gpt_llm(model_handle)
-        self.s3_news_prompts_bucket = s3_news_prompts_bucket
-        self.version = prompt_version
 
     def init_gpt_llm(self, model_handle):
         secret_name = "data-science-and-ml-models/openai"
@@ -151,7 +394,13 @@ class GPTProcessor:
             logger.error(f'Error initializing GPT model: {e}')
             return None
 
-    def process_metric(self, metric_name, content, source=None):
+    def complete(self, prompt):
+        if self.llm is None:
+            raise ValueError("GPT model is not initialized")
+        # Invoke the model directly; the rendered prompt is not a template and may contain braces
+        return self.llm.invoke(prompt).content
+
+    def _process_metric(self, metric_name, content, source=None):
         if content is None or self.llm is None:
             return None
 
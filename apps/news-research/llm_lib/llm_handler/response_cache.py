@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class SQLiteResponseStore:
+    """
+    Stores cached responses in a local SQLite file, e.g. for tests or a long-lived worker.
+    Expired rows are removed on read and the least recently used rows beyond max_entries are evicted on write.
+    """
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(cache_key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._connection.commit()
+
+    def get(self, cache_key):
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT value, expires_at FROM responses WHERE cache_key = ?",
+                                            (cache_key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._connection.execute("DELETE FROM responses WHERE cache_key = ?", (cache_key,))
+                self._connection.commit()
+                return None
+            self._connection.execute("UPDATE responses SET accessed_at = ? WHERE cache_key = ?", (now, cache_key))
+            self._connection.commit()
+            return row[0]
+
+    def put(self, cache_key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                     (cache_key, value, now + ttl, now))
+            self._connection.execute(
+                "DELETE FROM responses WHERE cache_key IN "
+                "(SELECT cache_key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class DynamoDBResponseStore:
+    """
+    Stores cached responses as items of a DynamoDB table with a `cache_key` string hash key.
+    Enable DynamoDB TTL on the `expires_at` attribute so expired items are also deleted, which bounds the table size.
+    """
+    def __init__(self, table_name, dynamodb_resource=None):
+        self.table = (dynamodb_resource or boto3.resource('dynamodb')).Table(table_name)
+
+    def get(self, cache_key):
+        item = self.table.get_item(Key={'cache_key': cache_key}).get('Item')
+        # TTL deletion is lazy, so expired items can still be returned for a while
+        if item is None or int(item['expires_at']) <= time.time():
+            return None
+        return item['value']
+
+    def put(self, cache_key, value, ttl):
+        self.table.put_item(Item={'cache_key': cache_key, 'value': value, 'expires_at': int(time.time() + ttl)})
+
+
+class S3ResponseStore:
+    """
+    Stores cached responses as small JSON objects under an S3 prefix.
+    Pair it with a lifecycle rule expiring the prefix after the TTL to bound its size.
+    """
+    def __init__(self, bucket_name, prefix='llm-response-cache', s3_client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix.rstrip('/')
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def get(self, cache_key):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=f"{self.prefix}/{cache_key}.json")
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        item = json.loads(response['Body'].read())
+        if item['expires_at'] <= time.time():
+            return None
+        return item['value']
+
+    def put(self, cache_key, value, ttl):
+        body = json.dumps({'value': value, 'expires_at': time.time() + ttl})
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=f"{self.prefix}/{cache_key}.json",
+                                  Body=body.encode('utf-8'), ContentType='application/json')
+
+
+class ResponseCache:
+    """
+    Persistent cache of processed LLM metric values keyed by model, prompt version, metric and a sha256 of
+    the article content and source, so identical inputs are only sent to the model once.
+    Failed (None) results are not cached. Store errors are logged and treated as misses.
+    """
+    def __init__(self, store, ttl=DEFAULT_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_id, prompt_version, metric_name, content, source):
+        digest = hashlib.sha256(json.dumps([content, source or ""]).encode('utf-8')).hexdigest()
+        return f"{model_id}/{prompt_version}/{metric_name}/{digest}"
+
+    @property
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def get(self, cache_key):
+        """
+        Returns:
+            (True, value) on a hit, (False, None) on a miss.
+        """
+        try:
+            value = self.store.get(cache_key)
+        except Exception as e:
+            logger.error(f'Error reading LLM response cache: {e}')
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+        return True, json.loads(value)
+
+    def put(self, cache_key, value):
+        if value is None:
+            return
+        try:
+            self.store.put(cache_key, json.dumps(value), self.ttl)
+        except Exception as e:
+            logger.error(f'Error writing LLM response cache: {e}')
+
+
+def response_cache_from_env():
+    """
+    Build the response cache configured by LLM_CACHE_TABLE (DynamoDB), LLM_CACHE_BUCKET (S3) or
+    LLM_CACHE_PATH (SQLite), with LLM_CACHE_TTL seconds; None when caching is not configured.
+    """
+    ttl = float(os.environ.get('LLM_CACHE_TTL', DEFAULT_TTL))
+    if os.environ.get('LLM_CACHE_TABLE'):
+        return ResponseCache(DynamoDBResponseStore(os.environ['LLM_CACHE_TABLE']), ttl=ttl)
+    if os.environ.get('LLM_CACHE_BUCKET'):
+        return ResponseCache(S3ResponseStore(os.environ['LLM_CACHE_BUCKET']), ttl=ttl)
+    if os.environ.get('LLM_CACHE_PATH'):
+        return ResponseCache(SQLiteResponseStore(os.environ['LLM_CACHE_PATH']), ttl=ttl)
+    return None
@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# The Lambda packages import response_cache as a top-level module
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache, SQLiteResponseStore  # noqa: E402
+
+
+class TestSQLiteResponseStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'responses.db')
+        self.now = 1000.0
+        clock = patch('response_cache.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _tick(self, seconds: float = 1.0):
+        self.now += seconds
+
+    def test_hit_and_miss(self):
+        cache = ResponseCache(SQLiteResponseStore(self.path), ttl=60)
+        key = ResponseCache.make_key('gpt-4o', 'v1', 'tags', 'article text', 'reuters.com')
+
+        self.assertEqual(cache.get(key), (False, None))
+        cache.put(key, ['a', 'b'])
+        cache.put(ResponseCache.make_key('gpt-4o', 'v1', 'summary', 'article text', 'reuters.com'), None)
+
+        self.assertEqual(cache.get(key), (True, ['a', 'b']))
+        self.assertEqual(cache.get(ResponseCache.make_key('gpt-4o', 'v2', 'tags', 'article text', 'reuters.com')),
+                         (False, None))
+        self.assertEqual(cache.stats, {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3})
+        self.assertEqual(len(cache.store), 1)
+
+    def test_entries_persist_across_connections(self):
+        SQLiteResponseStore(self.path).put('key', '"value"', ttl=60)
+        self.assertEqual(SQLiteResponseStore(self.path).get('key'), '"value"')
+
+    def test_ttl_expiry(self):
+        store = SQLiteResponseStore(self.path)
+        store.put('short', '1', ttl=10)
+        store.put('long', '2', ttl=100)
+
+        self._tick(10)
+
+        self.assertIsNone(store.get('short'))
+        self.assertEqual(store.get('long'), '2')
+        self.assertEqual(len(store), 1)
+
+    def test_lru_eviction(self):
+        store = SQLiteResponseStore(self.path, max_entries=2)
+        store.put('a', '1', ttl=60)
+        self._tick()
+        store.put('b', '2', ttl=60)
+        self._tick()
+        store.get('a')  # Mark as recently used
+        self._tick()
+        store.put('c', '3', ttl=60)
+
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(store.get('a'), '1')
+        self.assertEqual(store.get('c'), '3')
+        self.assertEqual(len(store), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -114,6 +114,7 @@ def get_from_secret_namager(secret_arn, region_name):
 
 
 def persist_s1_snowflake(creds, secret_credentials, s1_filing_df):
+    client = None
     try:
         snowflake_credentials = SnowflakeCredentials(
             account=creds["account"],
@@ -125,7 +126,8 @@ def persist_s1_snowflake(creds, secret_credentials, s1_filing_df):
             db_schema=creds["db_schema"],
         )
 
-        client = SnowflakeClient(snowflake_credentials)
+        # Reuse the warm client (and its authenticated connection) across records and invocations
+        client = SnowflakeClient.cached(snowflake_credentials)
 
         temp_table = "temp_s1_fillings_data_ops_fields_extraction"
         db_schema = creds["db_schema"]
@@ -156,11 +158,15 @@ def persist_s1_snowflake(creds, secret_credentials, s1_filing_df):
         results = client.fetchall(results_query)
         logger.info(f"Read results: {results}")
 
-        # Close the session
+        # Close the session, returning the connection to the pool
         client.close()
     
     except Exception as e:
         logger.error(f"Error occurred while saving S-1 filings to Snowflake: {str(e)}")
+        if client is not None:
+            # The shared session is reused by later records and warm invocations, so it must not stay failed
+            client.session.rollback()
+            client.close()
 
 
 
@@ -0,0 +1,258 @@
+import gzip
+import json
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+
+class Codec(ABC):
+    """Serializer for one file format.
+
+    `read` deserializes a binary file object (BytesIO, open file or mmap) and `write` serializes data
+    into a writable binary file object, raising TypeError for data it cannot encode.
+    """
+
+    name: str = ''
+    extensions: Tuple[str, ...] = ()
+    content_type: str = 'application/octet-stream'
+
+    @abstractmethod
+    def read(self, buffer: BinaryIO) -> Any:
+        pass
+
+    @abstractmethod
+    def write(self, data: Any, buffer: BinaryIO):
+        pass
+
+    def _unsupported(self, data: Any) -> TypeError:
+        return TypeError(f"Unsupported data type for {self.name}: {type(data)}")
+
+
+def _arrow_buffer(buffer: BinaryIO) -> pa.Buffer:
+    """Expose a BytesIO or mmap as an Arrow buffer without copying; other file objects are read."""
+    if hasattr(buffer, 'getbuffer'):
+        return pa.py_buffer(buffer.getbuffer())
+    try:
+        return pa.py_buffer(buffer)
+    except TypeError:
+        return pa.py_buffer(buffer.read())
+
+
+def json_dumps(data: Any) -> bytes:
+    """Encode JSON to UTF-8 bytes with orjson when it is installed, else the stdlib encoder."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:  # e.g. non-string dict keys, which the stdlib encoder coerces
+            pass
+    return json.dumps(data).encode('utf-8')
+
+
+def json_loads(raw: bytes) -> Any:
+    """Decode JSON bytes with orjson when it is installed, else the stdlib decoder."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:  # e.g. NaN or Infinity, which the stdlib decoder accepts
+            pass
+    return json.loads(raw)
+
+
+class CsvCodec(Codec):
+    """CSV through pandas."""
+
+    name = 'csv'
+    extensions = ('.csv',)
+    content_type = 'text/csv'
+
+    def read(self, buffer: BinaryIO) -> pd.DataFrame:
+        return pd.read_csv(buffer)
+
+    def write(self, data: pd.DataFrame, buffer: BinaryIO):
+        if not isinstance(data, pd.DataFrame):
+            raise self._unsupported(data)
+        data.to_csv(buffer, index=False)
+
+
+class ArrowCsvCodec(Codec):
+    """CSV through pyarrow's multithreaded reader and writer. Only used when chosen explicitly."""
+
+    name = 'arrow-csv'
+    content_type = 'text/csv'
+
+    def read(self, buffer: BinaryIO) -> pd.DataFrame:
+        return pa_csv.read_csv(pa.BufferReader(_arrow_buffer(buffer))).to_pandas()
+
+    def write(self, data: Union[pd.DataFrame, pa.Table], buffer: BinaryIO):
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, preserve_index=False)
+        if not isinstance(data, pa.Table):
+            raise self._unsupported(data)
+        pa_csv.write_csv(data, buffer)
+
+
+class NdjsonCodec(Codec):
+    """Newline-delimited JSON; records are decoded into a DataFrame and encoded from a list of dicts.
+
+    Decoding goes through pandas so column dtypes are inferred as before, e.g. `*_at` columns become datetimes.
+    """
+
+    name = 'ndjson'
+    extensions = ('.ndjson',)
+    content_type = 'application/x-ndjson'
+
+    def read(self, buffer: BinaryIO) -> pd.DataFrame:
+        return pd.read_json(buffer, lines=True)
+
+    def write(self, data: List[dict], buffer: BinaryIO):
+        if not isinstance(data, list):
+            raise self._unsupported(data)
+        buffer.write(b"\n".join(json_dumps(record) for record in data))
+
+
+class JsonCodec(Codec):
+    """A single JSON document, decoded to and encoded from a list or dict."""
+
+    name = 'json'
+    extensions = ('.json',)
+    content_type = 'application/json'
+
+    def read(self, buffer: BinaryIO) -> Union[list, dict]:
+        return json_loads(buffer.read())
+
+    def write(self, data: Union[list, dict], buffer: BinaryIO):
+        if not isinstance(data, (list, dict)):
+            raise self._unsupported(data)
+        buffer.write(json_dumps(data))
+
+
+class ParquetCodec(Codec):
+    name = 'parquet'
+    extensions = ('.parquet',)
+
+    def read(self, buffer: BinaryIO) -> pd.DataFrame:
+        return pq.read_table(pa.BufferReader(_arrow_buffer(buffer))).to_pandas()
+
+    def write(self, data: Union[pd.DataFrame, pa.Table], buffer: BinaryIO):
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(df=data)
+        if not isinstance(data, pa.Table):
+            raise self._unsupported(data)
+        pq.write_table(data, buffer)
+
+
+class ArrowIpcCodec(Codec):
+    """Arrow IPC file format (Feather v2): record batches are mapped in place without parsing."""
+
+    name = 'arrow'
+    extensions = ('.arrow', '.feather', '.ipc')
+    content_type = 'application/vnd.apache.arrow.file'
+
+    def read(self, buffer: BinaryIO) -> pd.DataFrame:
+        return ipc.open_file(pa.BufferReader(_arrow_buffer(buffer))).read_all().to_pandas()
+
+    def write(self, data: Union[pd.DataFrame, pa.Table], buffer: BinaryIO):
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(df=data)
+        if not isinstance(data, pa.Table):
+            raise self._unsupported(data)
+        with ipc.new_file(buffer, data.schema) as writer:
+            writer.write_table(data)
+
+
+class CompressedCodec(Codec):
+    """Wraps another codec in gzip or zstd whole-file compression, e.g. `.ndjson.gz` or `.csv.zst`."""
+
+    SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+    CONTENT_TYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+    def __init__(self, inner: Codec, compression: str):
+        if compression not in self.SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.inner = inner
+        self.compression = compression
+        suffix = self.SUFFIXES[compression]
+        self.name = f"{inner.name}{suffix}"
+        self.extensions = tuple(f"{extension}{suffix}" for extension in inner.extensions)
+        self.content_type = self.CONTENT_TYPES[compression]
+
+    def read(self, buffer: BinaryIO) -> Any:
+        if self.compression == 'gzip':
+            return self.inner.read(BytesIO(gzip.decompress(buffer.read())))
+        with pa.CompressedInputStream(pa.BufferReader(_arrow_buffer(buffer)), self.compression) as stream:
+            return self.inner.read(BytesIO(stream.read()))
+
+    def write(self, data: Any, buffer: BinaryIO):
+        raw = BytesIO()
+        self.inner.write(data, raw)
+        if self.compression == 'gzip':
+            buffer.write(gzip.compress(raw.getbuffer()))
+            return
+        compressed = pa.BufferOutputStream()
+        with pa.CompressedOutputStream(compressed, self.compression) as stream:
+            stream.write(raw.getbuffer())
+        buffer.write(compressed.getvalue())
+
+
+_codecs: Dict[str, Codec] = {}
+_codecs_by_extension: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec, override: bool = False):
+    """Register a codec under its name and extensions so it can be chosen explicitly or by key."""
+    if not override and codec.name in _codecs:
+        raise ValueError(f"Codec already registered: {codec.name}")
+    _codecs[codec.name] = codec
+    for extension in codec.extensions:
+        _codecs_by_extension[extension] = codec
+
+
+def get_codec(name: str) -> Codec:
+    """Return the codec registered under the name."""
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError(f"Unsupported file format: {name}") from None
+
+
+def codec_for_key(key: str, codec: Optional[str] = None) -> Codec:
+    """Return the codec named `codec`, or else the one registered for the longest extension the key ends with."""
+    if codec is not None:
+        return get_codec(codec)
+    matches = [extension for extension in _codecs_by_extension if key.endswith(extension)]
+    if not matches:
+        raise ValueError(f"Unsupported file type for key: {key}")
+    return _codecs_by_extension[max(matches, key=len)]
+
+
+def infer_file_format(key: str) -> str:
+    """Infer the file format (codec name) based on the file extension of the key."""
+    return codec_for_key(key).name
+
+
+def read(buffer: BinaryIO, file_format: str) -> Any:
+    """Deserialize a binary file object (BytesIO, open file or mmap) in the given format."""
+    return get_codec(file_format).read(buffer)
+
+
+def write(data: Any, file_format: str, buffer: BinaryIO):
+    """Serialize data in the given format into a writable binary file object."""
+    get_codec(file_format).write(data, buffer)
+
+
+for _codec in (CsvCodec(), ArrowCsvCodec(), NdjsonCodec(), JsonCodec(), ParquetCodec(), ArrowIpcCodec()):
+    register_codec(_codec)
+    if _codec.extensions:
+        for _compression in CompressedCodec.SUFFIXES:
+            register_codec(CompressedCodec(_codec, _compression))
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import boto3
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+INDEX_NAME = 'index.json'
+
+
+class DiskCacheStore:
+    """Stores cached bodies as files named by their sha256 digest under a local directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(os.path.join(self.directory, 'blobs'), exist_ok=True)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, digest: str, body: bytes):
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def delete(self, digest: str):
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def load_index(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.directory, INDEX_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_index(self, index: dict):
+        path = os.path.join(self.directory, INDEX_NAME)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(index, f)
+        os.replace(f"{path}.tmp", path)
+
+
+class S3CacheStore:
+    """Stores cached bodies as objects named by their sha256 digest under an S3 prefix."""
+
+    def __init__(self, bucket_name: str, prefix: str = 'http-cache', s3_client=None):
+        self.bucket_name = bucket_name
+        self.prefix = prefix.rstrip('/')
+        self.s3_client = s3_client or boto3.client('s3')
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=f"{self.prefix}/blobs/{digest}")
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read()
+
+    def put(self, digest: str, body: bytes):
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=f"{self.prefix}/blobs/{digest}", Body=body)
+
+    def delete(self, digest: str):
+        self.s3_client.delete_object(Bucket=self.bucket_name, Key=f"{self.prefix}/blobs/{digest}")
+
+    def load_index(self) -> Optional[dict]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=f"{self.prefix}/{INDEX_NAME}")
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def save_index(self, index: dict):
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=f"{self.prefix}/{INDEX_NAME}",
+                                  Body=json.dumps(index).encode('utf-8'), ContentType='application/json')
+
+
+class HttpCache:
+    """Size-bounded LRU cache of HTTP responses for conditional GETs.
+
+    Each URL maps to its ETag / Last-Modified validators and the sha256 digest of its body. Bodies are
+    content-addressed, so URLs serving identical content share one stored copy. Only responses carrying
+    a validator are cached, since anything else cannot be revalidated. Index changes are kept in memory
+    until `flush()`. Methods are thread-safe, so the store I/O can run in worker threads; the lock only
+    guards the index, and blob reads, writes and deletes happen outside it.
+    """
+
+    def __init__(self, store, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        index = store.load_index() or {}
+        self._entries: 'OrderedDict[str, dict]' = OrderedDict(index.get('entries', []))
+        self._blob_sizes: Dict[str, int] = {}
+        self._blob_refs: Dict[str, int] = {}
+        self._total_bytes = 0
+        for entry in self._entries.values():
+            self._add_ref(entry)
+
+    @property
+    def size(self) -> int:
+        """Total bytes of stored bodies."""
+        return self._total_bytes
+
+    @property
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'bytes_saved': self.bytes_saved,
+                'entries': len(self._entries), 'bytes': self.size}
+
+    def _add_ref(self, entry: dict):
+        digest = entry['digest']
+        self._blob_refs[digest] = self._blob_refs.get(digest, 0) + 1
+        if digest not in self._blob_sizes:
+            self._blob_sizes[digest] = entry['size']
+            self._total_bytes += entry['size']
+
+    def _remove(self, key: str) -> Optional[str]:
+        """Drop an entry, returning the digest of its body if no other entry shares it and it should be deleted."""
+        entry = self._entries.pop(key)
+        digest = entry['digest']
+        self._dirty = True
+        self._blob_refs[digest] -= 1
+        if self._blob_refs[digest] > 0:
+            return None
+        del self._blob_refs[digest]
+        self._total_bytes -= self._blob_sizes.pop(digest)
+        return digest
+
+    def _delete(self, digests: List[str]):
+        # A body re-added while its delete was pending is lost, but `get` then drops the entry and the URL is refetched
+        for digest in digests:
+            self.store.delete(digest)
+
+    def validators(self, key: str) -> Dict[str, str]:
+        """Conditional request headers for a cached URL, or an empty dict if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached body after a 304, counting the hit; None if the body is no longer stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        body = self.store.get(entry['digest'])
+        orphaned = []
+        with self._lock:
+            current = self._entries.get(key)
+            if body is None:
+                # Only drop the entry if it was not replaced while the body was being read
+                if current is not None and current['digest'] == entry['digest']:
+                    orphaned.append(self._remove(key))
+            else:
+                if current is not None:
+                    self._entries.move_to_end(key)
+                    self._dirty = True
+                self.hits += 1
+                self.bytes_saved += len(body)
+        self._delete([digest for digest in orphaned if digest is not None])
+        return body
+
+    def put(self, key: str, body: bytes, headers) -> bool:
+        """Cache a 200 response body under `key`, counting the miss. Returns whether it was stored."""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        cacheable = (etag or last_modified) and 'no-store' not in headers.get('Cache-Control', '') \
+            and len(body) <= self.max_bytes
+        digest = hashlib.sha256(body).hexdigest() if cacheable else None
+
+        if cacheable:
+            with self._lock:
+                stored = digest in self._blob_sizes
+            if not stored:
+                # Bodies are content-addressed, so a concurrent put of the same body writes the same blob
+                self.store.put(digest, body)
+
+        orphaned = []
+        with self._lock:
+            self.misses += 1
+            if key in self._entries:
+                orphaned.append(self._remove(key))
+            if cacheable:
+                entry = {'etag': etag, 'last_modified': last_modified, 'digest': digest, 'size': len(body)}
+                self._entries[key] = entry
+                self._add_ref(entry)
+                self._dirty = True
+
+                while self._total_bytes > self.max_bytes:
+                    orphaned.append(self._remove(next(iter(self._entries))))
+        # The new body may have replaced an entry sharing its digest, so it is never deleted here
+        self._delete([d for d in orphaned if d is not None and d != digest])
+        return bool(cacheable)
+
+    def flush(self):
+        """Persist the index if it changed."""
+        with self._lock:
+            if self._dirty:
+                self.store.save_index({'entries': list(self._entries.items())})
+                self._dirty = False
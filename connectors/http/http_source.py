@@ -1,11 +1,25 @@
 import asyncio
-from typing import Any, Dict, Optional
+import datetime
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Union
+from urllib.parse import urlencode
 
 import aiohttp
 from aiohttp_retry import RetryClient, ExponentialRetry
 
+from connectors.http.http_cache import HttpCache
+from connectors.http.rate_limiter import HostRateLimiter
 from connectors.source import Source
 
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 10
+DEFAULT_DNS_CACHE_TTL = 300
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_CONCURRENCY = 10
+DEFAULT_MAX_RETRY_AFTER = 60
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
 
 class HttpSource(Source):
     def __init__(self,
@@ -13,7 +27,15 @@ class HttpSource(Source):
                  retries: int = 3,
                  timeout: int = 5,
                  retry_statuses: Optional[list[int]] = None,
-                 backoff_factor: float = 0.5):
+                 backoff_factor: float = 0.5,
+                 limit: int = DEFAULT_CONNECTION_LIMIT,
+                 limit_per_host: int = DEFAULT_CONNECTION_LIMIT_PER_HOST,
+                 ttl_dns_cache: Optional[int] = DEFAULT_DNS_CACHE_TTL,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 connector: Optional[aiohttp.BaseConnector] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None,
+                 max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+                 cache: Optional[HttpCache] = None):
         """
         Initialize the HTTP source with retries, timeouts, and retry on specific status codes.
         :param default_headers: Default headers to include in each request
@@ -21,41 +43,204 @@ class HttpSource(Source):
         timeout: Timeout in seconds for each request
         :param retry_statuses: List of status codes to retry on
         :param backoff_factor: Factor for exponential backoff retries
+        :param limit: Maximum number of open connections in the pool
+        :param limit_per_host: Maximum number of open connections to a single host
+        :param ttl_dns_cache: Seconds to cache DNS lookups for (None caches forever)
+        :param keepalive_timeout: Seconds an idle keep-alive connection is kept open
+        :param connector: Shared connector to use instead of creating one; it is not closed with this source
+        :param rate_limiter: Per-host rate limiter applied to every attempt, including retries, before its timeout starts
+        :param max_retry_after: Upper bound in seconds on how long a 429 Retry-After is honoured
+        :param cache: Response cache used to revalidate repeated GETs with If-None-Match / If-Modified-Since
         """
         self.default_headers = default_headers or {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
             # noqa: E501
         }
         self.retries = retries  # Number of retries
+        self.backoff_factor = backoff_factor
         self.timeout = timeout  # Timeout in seconds
         self.retry_statuses = retry_statuses or [500, 502, 503, 504]  # Default to server errors
+        self.rate_limiter = rate_limiter
+        self.max_retry_after = max_retry_after
+        self.cache = cache
 
-        # Exponential backoff retry strategy
-        retry_options = ExponentialRetry(attempts=self.retries, statuses=self.retry_statuses, factor=backoff_factor)
+        # Retries are driven by `_get` so every attempt takes a rate limit token outside aiohttp's timeout
+        retry_options = ExponentialRetry(attempts=1)
         timeout_setting = aiohttp.ClientTimeout(total=self.timeout)
 
+        # Pooled keep-alive connections, shared with other sources when a connector is passed in
+        connector_owner = connector is None
+        self.connector = connector or aiohttp.TCPConnector(limit=limit,
+                                                           limit_per_host=limit_per_host,
+                                                           ttl_dns_cache=ttl_dns_cache,
+                                                           keepalive_timeout=keepalive_timeout)
+
         # Using RetryClient to automatically handle retries
-        self.session = RetryClient(client_session=aiohttp.ClientSession(timeout=timeout_setting),
+        self.session = RetryClient(client_session=aiohttp.ClientSession(timeout=timeout_setting,
+                                                                        connector=self.connector,
+                                                                        connector_owner=connector_owner),
                                    retry_options=retry_options)
 
+    @asynccontextmanager
+    async def _get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None) -> AsyncIterator[aiohttp.ClientResponse]:
+        """GET with retries, yielding the response of the final attempt.
+
+        Each attempt first waits for a rate limit token, so time spent throttled does not count against
+        the request timeout. 429s back off by their Retry-After and `retry_statuses` exponentially; the
+        last attempt's response is yielded whatever its status.
+        """
+        attempts = max(1, self.retries)
+        for attempt in range(attempts):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(url)
+            async with self.session.get(url, params=params, headers=headers) as response:
+                if attempt < attempts - 1:
+                    if response.status == 429:
+                        await self._back_off(url, self._retry_after(response.headers.get('Retry-After'), attempt))
+                        continue
+                    if response.status in self.retry_statuses:
+                        await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                        continue
+                yield response
+                return
+
+    async def __aenter__(self) -> 'HttpSource':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
     async def fetch(self, url: str, params: Optional[Dict[str, Any]] = None,
                     headers: Optional[Dict[str, str]] = None) -> bytes:
         """Fetch raw data in bytes from the provided URL."""
         combined_headers = {**self.default_headers, **(headers or {})}
+        cache_key = self._cache_key(url, params) if self.cache is not None else None
+        if cache_key is not None:
+            combined_headers.update(self.cache.validators(cache_key))
 
-        async with self.session.get(url, params=params, headers=combined_headers) as response:
+        async with self._get(url, params=params, headers=combined_headers) as response:
+            if response.status == 304 and cache_key is not None:
+                # Cache reads and writes hit disk or S3, so they run off the event loop
+                body = await asyncio.to_thread(self.cache.get, cache_key)
+                if body is not None:
+                    return body
+                # The cached body is gone and its entry was dropped, so this refetches unconditionally
+                return await self.fetch(url, params=params, headers=headers)
             response.raise_for_status()  # Raise an error for non-retryable bad responses
-            return await response.read()  # Fetch data as raw bytes
+            body = await response.read()  # Fetch data as raw bytes
+            if cache_key is not None:
+                await asyncio.to_thread(self.cache.put, cache_key, body, response.headers)
+            return body
+
+    async def fetch_stream(self, url: str, params: Optional[Dict[str, Any]] = None,
+                           headers: Optional[Dict[str, str]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           max_bytes: Optional[int] = None,
+                           allowed_content_types: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+        """Yield the response body in chunks as it arrives instead of buffering it.
+
+        Raises ValueError before reading the body if the Content-Type is not in `allowed_content_types`
+        (entries may be wildcards such as `text/*`) or the Content-Length exceeds `max_bytes`, and aborts
+        the download as soon as more than `max_bytes` have been received.
+        """
+        combined_headers = {**self.default_headers, **(headers or {})}
+
+        async with self._get(url, params=params, headers=combined_headers) as response:
+            response.raise_for_status()
+            self._check_content_type(url, response.content_type, allowed_content_types)
+            if max_bytes is not None and response.content_length is not None and response.content_length > max_bytes:
+                raise ValueError(f"Response from {url} is {response.content_length} bytes, over the {max_bytes} limit")
+
+            received = 0
+            async for chunk in response.content.iter_chunked(chunk_size):
+                received += len(chunk)
+                if max_bytes is not None and received > max_bytes:
+                    raise ValueError(f"Response from {url} exceeded the {max_bytes} byte limit")
+                yield chunk
+
+    async def fetch_to(self, url: str, sink: Union[str, BinaryIO], params: Optional[Dict[str, Any]] = None,
+                       headers: Optional[Dict[str, str]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       max_bytes: Optional[int] = None, allowed_content_types: Optional[List[str]] = None) -> int:
+        """Stream the response body into a file path or writable object and return the number of bytes written.
+
+        `sink` can be any binary writer, e.g. an open file or `S3Sink.open_writer(key)` for a multipart upload.
+        Writes run in a worker thread so a sink blocked on I/O does not stall the event loop.
+        """
+        if isinstance(sink, str):
+            with open(sink, 'wb') as f:
+                return await self.fetch_to(url, f, params=params, headers=headers, chunk_size=chunk_size,
+                                           max_bytes=max_bytes, allowed_content_types=allowed_content_types)
+
+        written = 0
+        async for chunk in self.fetch_stream(url, params=params, headers=headers, chunk_size=chunk_size,
+                                             max_bytes=max_bytes, allowed_content_types=allowed_content_types):
+            await asyncio.to_thread(sink.write, chunk)
+            written += len(chunk)
+        return written
+
+    @staticmethod
+    def _check_content_type(url: str, content_type: Optional[str], allowed_content_types: Optional[List[str]]):
+        """Raise ValueError if the response content type is not allowed."""
+        if allowed_content_types is None:
+            return
+        content_type = (content_type or '').lower()
+        for allowed in allowed_content_types:
+            allowed = allowed.lower()
+            if content_type == allowed or (allowed.endswith('/*') and content_type.startswith(allowed[:-1])):
+                return
+        raise ValueError(f"Unsupported content type {content_type!r} for {url}")
+
+    @staticmethod
+    def _cache_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    def _retry_after(self, retry_after: Optional[str], attempt: int) -> float:
+        """Seconds to wait after a 429, from a Retry-After header (seconds or HTTP date) or exponential backoff."""
+        delay = None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+        if delay is None:
+            delay = self.backoff_factor * (2 ** attempt)
+        return min(max(delay, 0.0), self.max_retry_after)
+
+    async def _back_off(self, url: str, delay: float):
+        """Pause requests after a 429: the whole host when rate limited, otherwise just this request."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.block_for(url, delay)
+        else:
+            await asyncio.sleep(delay)
+
+    async def fetch_many(self, urls: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY,
+                         return_exceptions: bool = False, **fetch_kwargs) -> List[Union[bytes, BaseException]]:
+        """Fetch several URLs concurrently, at most `concurrency` at a time, returning results in order.
+
+        With `return_exceptions=True` a failed URL yields its exception in place of the data instead of raising.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(url: str) -> bytes:
+            async with semaphore:
+                return await self.fetch(url, **fetch_kwargs)
+
+        return await asyncio.gather(*(fetch_one(url) for url in urls), return_exceptions=return_exceptions)
 
     async def close(self):
-        """Close the aiohttp session."""
+        """Close the aiohttp session and persist the cache index."""
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.flush)
         await self.session.close()  # Ensure the underlying session is closed
 
 
 # Example usage
 async def main():
-    http_source = HttpSource(default_headers={"User-Agent": "MyHttpSource/1.0"}, retries=3, timeout=10)
-    try:
+    async with HttpSource(default_headers={"User-Agent": "MyHttpSource/1.0"}, retries=3, timeout=10) as http_source:
         # Example API call
         url = "https://api.example.com/data"  # Replace with your API endpoint
         params = {"key": "value"}  # Example query parameters if needed
@@ -63,8 +248,10 @@ async def main():
 
         raw_data = await http_source.fetch(url, params=params, headers=headers)
         print(f"Fetched {len(raw_data)} bytes of data")
-    finally:
-        await http_source.close()
+
+        # Fan out over several URLs on the shared connection pool
+        results = await http_source.fetch_many([url, url], concurrency=2, return_exceptions=True)
+        print(f"Fetched {sum(isinstance(result, bytes) for result in results)} of {len(results)} URLs")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_RATE = 2.0
+
+
+class TokenBucket:
+    """Asyncio token bucket allowing `rate` acquisitions per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it. Waiters are served in arrival order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def block_for(self, delay: float):
+        """Hold back every acquisition for `delay` seconds, e.g. after a 429 with Retry-After."""
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + delay)
+        self._refill(now)
+        self._tokens = 0.0
+
+
+class HostRateLimiter:
+    """Per-host token buckets, configured per domain.
+
+    A domain rate applies to the domain and all of its subdomains and is shared between them
+    (e.g. `{'sec.gov': 8}` covers www.sec.gov and data.sec.gov together). Hosts matching no
+    configured domain each get their own bucket at `default_rate`.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: float = DEFAULT_RATE):
+        self.rates = {domain.lower().lstrip('.'): rate for domain, rate in (rates or {}).items()}
+        self.default_rate = default_rate
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket_key(self, host: str) -> str:
+        labels = host.lower().split('.')
+        for i in range(len(labels)):
+            domain = '.'.join(labels[i:])
+            if domain in self.rates:
+                return domain
+        return host.lower()
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Return the bucket governing requests to the host of `url`."""
+        key = self._bucket_key(urlsplit(url).hostname or '')
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(self.rates.get(key, self.default_rate))
+        return self._buckets[key]
+
+    async def acquire(self, url: str):
+        """Wait for permission to send a request to the host of `url`."""
+        await self.bucket(url).acquire()
+
+    def block_for(self, url: str, delay: float):
+        """Back off every request to the host of `url` for `delay` seconds."""
+        self.bucket(url).block_for(delay)
@@ -0,0 +1,118 @@
+import hashlib
+import tempfile
+import unittest
+
+import boto3
+from moto import mock_aws
+
+from connectors.http.http_cache import DiskCacheStore, HttpCache, S3CacheStore
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = DiskCacheStore(self.tmp_dir.name)
+        self.cache = HttpCache(self.store, max_bytes=10)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_validators_and_hit(self):
+        self.assertEqual(self.cache.validators('https://a/feed'), {})
+        self.cache.put('https://a/feed', b'atom', {'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+
+        self.assertEqual(self.cache.validators('https://a/feed'),
+                         {'If-None-Match': '"v1"', 'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(self.cache.get('https://a/feed'), b'atom')
+        self.assertEqual(self.cache.stats['hits'], 1)
+        self.assertEqual(self.cache.stats['misses'], 1)
+        self.assertEqual(self.cache.stats['bytes_saved'], 4)
+
+    def test_responses_without_validators_are_not_cached(self):
+        self.assertFalse(self.cache.put('https://a/page', b'html', {}))
+        self.assertFalse(self.cache.put('https://a/page', b'html', {'ETag': '"v1"', 'Cache-Control': 'no-store'}))
+        self.assertEqual(self.cache.validators('https://a/page'), {})
+
+    def test_content_addressed_bodies_are_shared(self):
+        self.cache.put('https://a/1', b'same', {'ETag': '"1"'})
+        self.cache.put('https://a/2', b'same', {'ETag': '"2"'})
+        self.assertEqual(self.cache.size, 4)
+
+    def test_lru_eviction_by_size(self):
+        self.cache.put('https://a/1', b'aaaa', {'ETag': '"1"'})
+        self.cache.put('https://a/2', b'bbbb', {'ETag': '"2"'})
+        self.cache.get('https://a/1')  # Mark as recently used
+        self.cache.put('https://a/3', b'cccc', {'ETag': '"3"'})
+
+        self.assertEqual(self.cache.validators('https://a/2'), {})
+        self.assertEqual(self.cache.get('https://a/1'), b'aaaa')
+        self.assertEqual(self.cache.get('https://a/3'), b'cccc')
+        self.assertEqual(self.cache.size, 8)
+
+    def test_size_tracks_replaced_and_removed_bodies(self):
+        self.cache.put('https://a/1', b'aaaa', {'ETag': '"1"'})
+        self.cache.put('https://a/1', b'aaaaaa', {'ETag': '"2"'})
+        self.assertEqual(self.cache.size, 6)
+        self.cache.put('https://a/1', b'uncacheable', {})
+        self.assertEqual(self.cache.size, 0)
+
+    def test_blob_io_runs_outside_the_lock(self):
+        cache = self.cache
+        lock_states = []
+
+        class CheckingStore(DiskCacheStore):
+            def get(self, digest):
+                lock_states.append(cache._lock.locked())
+                return super().get(digest)
+
+            def put(self, digest, body):
+                lock_states.append(cache._lock.locked())
+                super().put(digest, body)
+
+            def delete(self, digest):
+                lock_states.append(cache._lock.locked())
+                super().delete(digest)
+
+        cache.store = CheckingStore(self.tmp_dir.name)
+        cache.put('https://a/1', b'aaaa', {'ETag': '"1"'})
+        cache.put('https://a/1', b'aaaa', {'ETag': '"2"'})  # Same body, so its blob must survive
+        self.assertEqual(cache.get('https://a/1'), b'aaaa')
+        cache.put('https://a/1', b'bbbb', {'ETag': '"3"'})
+
+        self.assertEqual(lock_states, [False] * 4)  # put, get, put and the delete of the replaced body
+        self.assertIsNone(self.store.get(hashlib.sha256(b'aaaa').hexdigest()))
+
+    def test_index_persisted_on_flush(self):
+        self.cache.put('https://a/feed', b'atom', {'ETag': '"v1"'})
+        self.cache.flush()
+
+        reloaded = HttpCache(DiskCacheStore(self.tmp_dir.name), max_bytes=10)
+        self.assertEqual(reloaded.validators('https://a/feed'), {'If-None-Match': '"v1"'})
+        self.assertEqual(reloaded.get('https://a/feed'), b'atom')
+
+
+class TestS3CacheStore(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_aws = mock_aws()
+        self.mock_aws.start()
+        self.s3_client = boto3.client('s3', region_name='us-east-1')
+        self.s3_client.create_bucket(Bucket='test-bucket')
+
+    def tearDown(self):
+        self.mock_aws.stop()
+
+    def test_round_trip(self):
+        store = S3CacheStore('test-bucket', prefix='http-cache/', s3_client=self.s3_client)
+        cache = HttpCache(store)
+        cache.put('https://a/feed', b'atom', {'ETag': '"v1"'})
+        cache.flush()
+
+        reloaded = HttpCache(S3CacheStore('test-bucket', prefix='http-cache', s3_client=self.s3_client))
+        self.assertEqual(reloaded.get('https://a/feed'), b'atom')
+        self.assertIsNone(store.get('missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,17 @@
 import asyncio
+import os
+import tempfile
 import unittest
+from io import BytesIO
 from unittest.mock import patch, AsyncMock
 
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from connectors.http.http_cache import DiskCacheStore, HttpCache
 from connectors.http.http_source import HttpSource
+from connectors.http.rate_limiter import HostRateLimiter
 
 
 class TestHttpSource(unittest.IsolatedAsyncioTestCase):
@@ -85,6 +94,221 @@ class TestHttpSource(unittest.IsolatedAsyncioTestCase):
     async def test_close_session(self):
         await self.http_source.close()  # Should not raise any errors
 
+    async def test_async_context_manager_closes_session(self):
+        async with HttpSource(limit=20, limit_per_host=5, ttl_dns_cache=60, keepalive_timeout=10) as http_source:
+            self.assertEqual(http_source.connector.limit, 20)
+            self.assertEqual(http_source.connector.limit_per_host, 5)
+        self.assertTrue(http_source.connector.closed)
+
+    async def test_shared_connector_not_closed(self):
+        connector = aiohttp.TCPConnector()
+        async with HttpSource(connector=connector):
+            pass
+        self.assertFalse(connector.closed)
+        await connector.close()
+
+    async def test_fetch_many_in_order_with_bounded_concurrency(self):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def fetch(url, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return url.encode()
+
+        urls = [f'https://api.example.com/{i}' for i in range(10)]
+        with patch.object(self.http_source, 'fetch', side_effect=fetch):
+            results = await self.http_source.fetch_many(urls, concurrency=3)
+
+        self.assertEqual(results, [url.encode() for url in urls])
+        self.assertEqual(max_in_flight, 3)
+
+    async def test_fetch_many_return_exceptions(self):
+        async def fetch(url, **kwargs):
+            if url.endswith('bad'):
+                raise aiohttp.ClientError("boom")
+            return b'ok'
+
+        with patch.object(self.http_source, 'fetch', side_effect=fetch):
+            results = await self.http_source.fetch_many(['https://a/ok', 'https://a/bad'], return_exceptions=True)
+            self.assertEqual(results[0], b'ok')
+            self.assertIsInstance(results[1], aiohttp.ClientError)
+
+            with self.assertRaises(aiohttp.ClientError):
+                await self.http_source.fetch_many(['https://a/ok', 'https://a/bad'])
+
+    def _mock_response(self, status, body=b'', headers=None):
+        mock_response = AsyncMock()
+        mock_response.status = status
+        mock_response.headers = headers or {}
+        mock_response.read.return_value = body
+        mock_response.__aenter__.return_value = mock_response
+        return mock_response
+
+    async def test_fetch_honours_retry_after_on_429(self):
+        limiter = HostRateLimiter({'sec.gov': 8})
+        self.http_source = HttpSource(rate_limiter=limiter)
+        responses = [self._mock_response(429, headers={'Retry-After': '0.05'}), self._mock_response(200, b'ok')]
+
+        with patch.object(self.http_source.session, 'get', side_effect=responses) as mock_get:
+            with patch.object(limiter, 'block_for', wraps=limiter.block_for) as mock_block:
+                raw_data = await self.http_source.fetch('https://www.sec.gov/feed')
+
+        self.assertEqual(raw_data, b'ok')
+        self.assertEqual(mock_get.call_count, 2)
+        mock_block.assert_called_once_with('https://www.sec.gov/feed', 0.05)
+        await self.http_source.close()
+
+    async def test_fetch_gives_up_after_repeated_429(self):
+        self.http_source = HttpSource(retries=2, backoff_factor=0.01)
+        responses = [self._mock_response(429), self._mock_response(429)]
+
+        with patch.object(self.http_source.session, 'get', side_effect=responses) as mock_get:
+            await self.http_source.fetch('https://news.example.com/')
+
+        self.assertEqual(mock_get.call_count, 2)
+        responses[1].raise_for_status.assert_called_once()
+
+    def test_retry_after_parsing(self):
+        self.assertEqual(self.http_source._retry_after('3', 0), 3)
+        self.assertEqual(self.http_source._retry_after('Wed, 21 Oct 2015 07:28:00 GMT', 0), 0)
+        self.assertEqual(self.http_source._retry_after('3600', 0), self.http_source.max_retry_after)
+        self.assertEqual(self.http_source._retry_after(None, 2), self.http_source.backoff_factor * 4)
+
+    async def test_rate_limiter_throttles_every_attempt(self):
+        limiter = HostRateLimiter(default_rate=100)
+        self.http_source = HttpSource(rate_limiter=limiter, backoff_factor=0.01)
+        responses = [self._mock_response(503), self._mock_response(200, b'ok')]
+
+        with patch.object(self.http_source.session, 'get', side_effect=responses) as mock_get:
+            with patch.object(limiter, 'acquire', AsyncMock()) as mock_acquire:
+                raw_data = await self.http_source.fetch('https://www.sec.gov/feed')
+
+        self.assertEqual(raw_data, b'ok')
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_acquire.await_count, 2)
+        mock_acquire.assert_awaited_with('https://www.sec.gov/feed')
+        await self.http_source.close()
+
+    async def test_rate_limit_wait_does_not_disable_timeout(self):
+        """Test that a request still times out when its rate limit wait outlasts the request timeout."""
+        release = asyncio.Event()
+
+        async def slow(request):
+            await release.wait()
+            return web.Response(body=b'late')
+
+        app = web.Application()
+        app.router.add_get('/slow', slow)
+        server = TestServer(app)
+        await server.start_server()
+        # The second request waits ~1s for its token, longer than the 0.3s timeout
+        self.http_source = HttpSource(timeout=0.3, retries=1, rate_limiter=HostRateLimiter(default_rate=1))
+        try:
+            url = str(server.make_url('/slow'))
+            results = await asyncio.wait_for(self.http_source.fetch_many([url, url], return_exceptions=True), 5)
+        finally:
+            release.set()
+            await self.http_source.close()
+            await server.close()
+
+        self.assertEqual([type(result) for result in results], [asyncio.TimeoutError, asyncio.TimeoutError])
+
+    async def test_fetch_revalidates_cached_response(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = HttpCache(DiskCacheStore(tmp_dir))
+            self.http_source = HttpSource(cache=cache)
+            responses = [self._mock_response(200, b'atom feed', headers={'ETag': '"v1"'}),
+                         self._mock_response(304)]
+
+            with patch.object(self.http_source.session, 'get', side_effect=responses) as mock_get:
+                first = await self.http_source.fetch('https://www.sec.gov/feed', params={'b': 1, 'a': 2})
+                second = await self.http_source.fetch('https://www.sec.gov/feed', params={'a': 2, 'b': 1})
+
+            self.assertEqual(first, b'atom feed')
+            self.assertEqual(second, b'atom feed')
+            self.assertNotIn('If-None-Match', mock_get.call_args_list[0].kwargs['headers'])
+            self.assertEqual(mock_get.call_args_list[1].kwargs['headers']['If-None-Match'], '"v1"')
+            responses[1].read.assert_not_called()
+            self.assertEqual(cache.stats['bytes_saved'], len(b'atom feed'))
+            await self.http_source.close()
+            self.assertIsNotNone(DiskCacheStore(tmp_dir).load_index())
+
+    async def test_fetch_refetches_when_cached_body_missing(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = DiskCacheStore(tmp_dir)
+            cache = HttpCache(store)
+            cache.put('https://a/page', b'old', {'ETag': '"v1"'})
+            store.delete(cache._entries['https://a/page']['digest'])
+            self.http_source = HttpSource(cache=cache)
+            responses = [self._mock_response(304), self._mock_response(200, b'new', headers={'ETag': '"v2"'})]
+
+            with patch.object(self.http_source.session, 'get', side_effect=responses) as mock_get:
+                raw_data = await self.http_source.fetch('https://a/page')
+
+            self.assertEqual(raw_data, b'new')
+            self.assertNotIn('If-None-Match', mock_get.call_args_list[1].kwargs['headers'])
+            await self.http_source.close()
+
+    def _mock_stream_response(self, chunks, content_type='text/html', content_length=None):
+        async def iter_chunked(chunk_size):
+            for chunk in chunks:
+                yield chunk
+
+        mock_response = self._mock_response(200)
+        mock_response.content_type = content_type
+        mock_response.content_length = content_length
+        mock_response.content.iter_chunked = iter_chunked
+        return mock_response
+
+    async def test_fetch_stream_yields_chunks(self):
+        mock_response = self._mock_stream_response([b'<html>', b'body', b'</html>'])
+
+        with patch.object(self.http_source.session, 'get', return_value=mock_response):
+            chunks = [chunk async for chunk in self.http_source.fetch_stream('https://a/page')]
+
+        self.assertEqual(chunks, [b'<html>', b'body', b'</html>'])
+        mock_response.read.assert_not_called()
+
+    async def test_fetch_stream_aborts_over_max_bytes(self):
+        mock_response = self._mock_stream_response([b'x' * 10, b'x' * 10, b'x' * 10])
+        received = []
+
+        with patch.object(self.http_source.session, 'get', return_value=mock_response):
+            with self.assertRaises(ValueError):
+                async for chunk in self.http_source.fetch_stream('https://a/page', max_bytes=15):
+                    received.append(chunk)
+        self.assertEqual(received, [b'x' * 10])
+
+        with patch.object(self.http_source.session, 'get',
+                          return_value=self._mock_stream_response([b'x'], content_length=100)):
+            with self.assertRaises(ValueError):
+                await self.http_source.fetch_to('https://a/page', BytesIO(), max_bytes=15)
+
+    async def test_fetch_stream_content_type_allow_list(self):
+        with patch.object(self.http_source.session, 'get',
+                          return_value=self._mock_stream_response([b'%PDF'], content_type='application/pdf')):
+            with self.assertRaises(ValueError):
+                await self.http_source.fetch_to('https://a/doc', BytesIO(), allowed_content_types=['text/*'])
+
+        with patch.object(self.http_source.session, 'get',
+                          return_value=self._mock_stream_response([b'<html>'], content_type='text/html')):
+            written = await self.http_source.fetch_to('https://a/doc', BytesIO(), allowed_content_types=['text/*'])
+        self.assertEqual(written, 6)
+
+    async def test_fetch_to_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'filing.html')
+            with patch.object(self.http_source.session, 'get', return_value=self._mock_stream_response([b'a', b'b'])):
+                written = await self.http_source.fetch_to('https://www.sec.gov/filing.html', path)
+
+            self.assertEqual(written, 2)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'ab')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import time
+import unittest
+
+from connectors.http.rate_limiter import HostRateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+
+    async def test_acquire_respects_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    async def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    async def test_block_for(self):
+        bucket = TokenBucket(rate=1000)
+        bucket.block_for(0.1)
+        start = time.monotonic()
+        await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestHostRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_domain_rates_shared_by_subdomains(self):
+        limiter = HostRateLimiter({'sec.gov': 8}, default_rate=2)
+
+        edgar = limiter.bucket('https://www.sec.gov/cgi-bin/browse-edgar')
+        self.assertIs(limiter.bucket('https://data.sec.gov/submissions/CIK0000320193.json'), edgar)
+        self.assertEqual(edgar.rate, 8)
+
+        news = limiter.bucket('https://news.example.com/article')
+        self.assertEqual(news.rate, 2)
+        self.assertIsNot(limiter.bucket('https://other.example.com/article'), news)
+        self.assertIsNot(limiter.bucket('https://notsec.gov/'), edgar)
+
+    async def test_hosts_do_not_block_each_other(self):
+        limiter = HostRateLimiter(default_rate=1)
+        limiter.block_for('https://slow.example.com/', 1)
+        await asyncio.wait_for(limiter.acquire('https://fast.example.com/'), timeout=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
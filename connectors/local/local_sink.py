@@ -0,0 +1,28 @@
+import os
+from typing import TypeVar, Generic, Optional
+
+from connectors import formats
+from connectors.sink import Sink
+
+T = TypeVar('T')
+
+
+class LocalFileSink(Sink[T], Generic[T]):
+    """Sink writing keys as files under a root directory, with the same format dispatch as S3Sink."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def load(self, data: T, key: str, codec: Optional[str] = None):
+        """Write data to a file based on the file extension or `codec`, replacing it atomically."""
+        file_format = formats.codec_for_key(key, codec).name
+        path = os.path.join(self.root_dir, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                formats.write(data, file_format, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
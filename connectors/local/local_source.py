@@ -0,0 +1,39 @@
+import mmap
+import os
+from io import BytesIO
+from typing import TypeVar, Generic, List, Optional
+
+from connectors import formats
+from connectors.source import Source
+
+T = TypeVar('T')
+
+
+class LocalFileSource(Source[T], Generic[T]):
+    """Source reading keys as files under a root directory, with the same format dispatch as S3Source."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, *key.split('/'))
+
+    def fetch(self, key: str, codec: Optional[str] = None) -> T:
+        """Read a file through a memory map and return it as the specified type T."""
+        file_format = formats.codec_for_key(key, codec).name
+        with open(self._path(key), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return formats.read(BytesIO(b''), file_format)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return formats.read(mapped, file_format)
+
+    def list(self, prefix: str = '') -> List[str]:
+        """List all keys (paths relative to the root, '/'-separated) starting with the prefix."""
+        keys = []
+        for dir_path, _, file_names in os.walk(self.root_dir):
+            relative_dir = os.path.relpath(dir_path, self.root_dir).replace(os.sep, '/')
+            for file_name in file_names:
+                key = file_name if relative_dir == '.' else f"{relative_dir}/{file_name}"
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from connectors.local.local_sink import LocalFileSink
+from connectors.local.local_source import LocalFileSource
+
+
+class TestLocalFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sink = LocalFileSink(self.tmp_dir.name)
+        self.source = LocalFileSource[pd.DataFrame](self.tmp_dir.name)
+        self.df = pd.DataFrame({'col1': [1, 2, 3], 'col2': ['a', 'b', 'c']})
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip_dataframe_formats(self):
+        """Test writing and reading back CSV and Parquet files."""
+        for key in ['data/file.csv', 'data/file.parquet']:
+            self.sink.load(self.df, key)
+            pd.testing.assert_frame_equal(self.source.fetch(key), self.df)
+
+    def test_round_trip_json_formats(self):
+        """Test writing and reading back JSON and NDJSON files."""
+        records = [{'col1': 1, 'col2': 'a'}, {'col1': 2, 'col2': 'b'}]
+        self.sink.load(records, 'data/file.json')
+        self.sink.load(records, 'data/file.ndjson')
+
+        self.assertEqual(self.source.fetch('data/file.json'), records)
+        pd.testing.assert_frame_equal(self.source.fetch('data/file.ndjson'), pd.DataFrame(records))
+        with open(os.path.join(self.tmp_dir.name, 'data', 'file.json')) as f:
+            self.assertEqual(json.load(f), records)
+
+    def test_list_keys(self):
+        """Test listing keys relative to the root directory."""
+        self.sink.load(self.df, 'data/a.csv')
+        self.sink.load(self.df, 'data/sub/b.parquet')
+        self.sink.load(self.df, 'other/c.csv')
+
+        self.assertEqual(self.source.list('data/'), ['data/a.csv', 'data/sub/b.parquet'])
+        self.assertEqual(len(self.source.list()), 3)
+
+    def test_unsupported_inputs(self):
+        """Test unsupported extensions and data types."""
+        with self.assertRaises(ValueError):
+            self.sink.load(self.df, 'data/file.txt')
+        with self.assertRaises(TypeError):
+            self.sink.load({'a': 1}, 'data/file.csv')
+        self.assertEqual(self.source.list(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import threading
+from io import BytesIO
+from typing import TypeVar, Generic, Dict, Optional
+
+from connectors import formats
+from connectors.sink import Sink
+
+T = TypeVar('T')
+
+
+class MemorySink(Sink[T], Generic[T]):
+    """Sink serializing data into a dict of key -> bytes, with the same format dispatch as S3Sink."""
+
+    def __init__(self, objects: Optional[Dict[str, bytes]] = None):
+        self.objects = objects if objects is not None else {}
+        self._lock = threading.Lock()
+
+    def load(self, data: T, key: str, codec: Optional[str] = None):
+        """Serialize data based on the file extension or `codec` and store it under the key."""
+        file_format = formats.codec_for_key(key, codec).name
+        buffer = BytesIO()
+        formats.write(data, file_format, buffer)
+        with self._lock:
+            self.objects[key] = buffer.getvalue()
@@ -0,0 +1,26 @@
+from io import BytesIO
+from typing import TypeVar, Generic, Dict, List, Optional
+
+from connectors import formats
+from connectors.source import Source
+
+T = TypeVar('T')
+
+
+class MemorySource(Source[T], Generic[T]):
+    """Source serving serialized objects from a dict of key -> bytes, with the same format dispatch as S3Source.
+
+    Pass `MemorySink.objects` to read back what a sink wrote.
+    """
+
+    def __init__(self, objects: Optional[Dict[str, bytes]] = None):
+        self.objects = objects if objects is not None else {}
+
+    def fetch(self, key: str, codec: Optional[str] = None) -> T:
+        """Deserialize the object stored under the key and return it as the specified type T."""
+        file_format = formats.codec_for_key(key, codec).name
+        return formats.read(BytesIO(self.objects[key]), file_format)
+
+    def list(self, prefix: str = '') -> List[str]:
+        """List all keys starting with the prefix."""
+        return sorted(key for key in self.objects if key.startswith(prefix))
@@ -0,0 +1,39 @@
+import unittest
+
+import pandas as pd
+
+from connectors.memory.memory_sink import MemorySink
+from connectors.memory.memory_source import MemorySource
+
+
+class TestMemory(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = MemorySink()
+        self.source = MemorySource(self.sink.objects)
+
+    def test_round_trip(self):
+        """Test that data written to the sink is serialized and can be read back."""
+        df = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+        self.sink.load(df, 'data/file.parquet')
+        self.sink.load(df, 'data/file.csv')
+        self.sink.load({'col1': 1}, 'data/file.json')
+
+        self.assertIsInstance(self.sink.objects['data/file.parquet'], bytes)
+        pd.testing.assert_frame_equal(self.source.fetch('data/file.parquet'), df)
+        pd.testing.assert_frame_equal(self.source.fetch('data/file.csv'), df)
+        self.assertEqual(self.source.fetch('data/file.json'), {'col1': 1})
+
+    def test_list_keys(self):
+        """Test listing keys by prefix."""
+        source = MemorySource({'a/1.json': b'{}', 'a/2.json': b'[]', 'b/3.json': b'{}'})
+        self.assertEqual(source.list('a/'), ['a/1.json', 'a/2.json'])
+
+    def test_missing_key(self):
+        """Test fetching a missing key."""
+        with self.assertRaises(KeyError):
+            self.source.fetch('missing.json')
+
+
+if __name__ == '__main__':
+    unittest.main()
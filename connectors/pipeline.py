@@ -0,0 +1,252 @@
+import queue
+import threading
+import time
+from concurrent.futures import (Executor, ProcessPoolExecutor, ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED,
+                                wait)
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from connectors.sink import Sink
+from connectors.source import Source
+
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_QUEUE_SIZE = 64
+
+# Marks the end of a stage's output on the queue to the next stage
+_DONE = object()
+
+
+class StageStats:
+    """Counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float, errors: int = 0):
+        with self._lock:
+            self.items += items
+            self.errors += errors
+            self.busy_seconds += seconds
+
+    @property
+    def throughput(self) -> float:
+        """Items per second of busy time, summed over the stage's workers."""
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (f"StageStats(name={self.name!r}, items={self.items}, errors={self.errors}, "
+                f"busy_seconds={self.busy_seconds:.3f}, throughput={self.throughput:.1f}/s)")
+
+
+class PipelineStats:
+    """Per-stage counters, wall-clock time and the errors of a pipeline run."""
+
+    def __init__(self):
+        self.fetch = StageStats('fetch')
+        self.transform = StageStats('transform')
+        self.load = StageStats('load')
+        self.wall_seconds = 0.0
+        self.errors: List[Tuple[str, str, BaseException]] = []
+        self._lock = threading.Lock()
+
+    def add_error(self, stage: str, key: str, error: BaseException):
+        with self._lock:
+            self.errors.append((stage, key, error))
+
+    @property
+    def stages(self) -> List[StageStats]:
+        return [self.fetch, self.transform, self.load]
+
+    @property
+    def throughput(self) -> float:
+        """Items loaded per second of wall-clock time."""
+        return self.load.items / self.wall_seconds if self.wall_seconds else 0.0
+
+    def __repr__(self) -> str:
+        return (f"PipelineStats(wall_seconds={self.wall_seconds:.3f}, throughput={self.throughput:.1f}/s, "
+                f"stages={self.stages}, errors={len(self.errors)})")
+
+
+def _apply_transforms(transforms: Sequence[Callable[[Any], Any]], batch: List[Tuple[str, Any]]):
+    """Run every transform over each item of a batch; module level so process pools can pickle it.
+
+    Returns the surviving (key, data) pairs, the (key, error) pairs of failed items and the time spent.
+    A transform returning None drops the item.
+    """
+    start = time.perf_counter()
+    results, errors = [], []
+    for key, data in batch:
+        try:
+            for transform in transforms:
+                data = transform(data)
+                if data is None:
+                    break
+            if data is not None:
+                results.append((key, data))
+        except Exception as e:
+            errors.append((key, e))
+    return results, errors, time.perf_counter() - start
+
+
+class Pipeline:
+    """Batched, parallel Source -> transforms -> Sink runner.
+
+    Keys are fetched from the source by `fetch_workers` threads, grouped into batches of `batch_size`
+    and run through `transforms` on a thread or process pool of `transform_workers`, then loaded into
+    the sink by `load_workers` threads under `output_key(key)`. Stages are connected by queues of at
+    most `queue_size` items, so a slow stage applies backpressure instead of letting data pile up in
+    memory. Use `executor='process'` for CPU-bound transforms; they must then be picklable (e.g. module
+    level functions). Failed items are recorded in the returned stats and do not stop the run.
+    """
+
+    def __init__(self, source: Source, transforms: Sequence[Callable[[Any], Any]], sink: Sink,
+                 output_key: Optional[Callable[[str], str]] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 fetch_workers: int = 4,
+                 transform_workers: int = 4,
+                 load_workers: int = 4,
+                 executor: str = 'thread',
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unsupported executor: {executor}")
+        self.source = source
+        self.transforms = list(transforms)
+        self.sink = sink
+        self.output_key = output_key or (lambda key: key)
+        self.batch_size = max(1, batch_size)
+        self.fetch_workers = max(1, fetch_workers)
+        self.transform_workers = max(1, transform_workers)
+        self.load_workers = max(1, load_workers)
+        self.executor = executor
+        self.queue_size = max(1, queue_size)
+
+    def _make_executor(self) -> Executor:
+        if self.executor == 'process':
+            return ProcessPoolExecutor(max_workers=self.transform_workers)
+        return ThreadPoolExecutor(max_workers=self.transform_workers)
+
+    def run(self, keys: Optional[Iterable[str]] = None, prefix: str = '') -> PipelineStats:
+        """Process `keys`, or every key the source lists under `prefix`, and return the run's stats."""
+        stats = PipelineStats()
+        start = time.perf_counter()
+        keys = list(keys) if keys is not None else self.source.list(prefix)
+
+        pending_keys = queue.Queue()
+        for key in keys:
+            pending_keys.put(key)
+        fetched = queue.Queue(maxsize=self.queue_size)
+        transformed = queue.Queue(maxsize=self.queue_size)
+
+        fetchers = [threading.Thread(target=self._fetch_worker, args=(pending_keys, fetched, stats), daemon=True)
+                    for _ in range(self.fetch_workers)]
+        dispatcher = threading.Thread(target=self._transform_dispatcher, args=(fetched, transformed, stats),
+                                      daemon=True)
+        loaders = [threading.Thread(target=self._load_worker, args=(transformed, stats), daemon=True)
+                   for _ in range(self.load_workers)]
+
+        for thread in fetchers + [dispatcher] + loaders:
+            thread.start()
+        for thread in fetchers:
+            thread.join()
+        fetched.put(_DONE)
+        dispatcher.join()
+        for thread in loaders:
+            thread.join()
+
+        stats.wall_seconds = time.perf_counter() - start
+        return stats
+
+    def _fetch_worker(self, pending_keys: queue.Queue, fetched: queue.Queue, stats: PipelineStats):
+        while True:
+            try:
+                key = pending_keys.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            try:
+                data = self.source.fetch(key)
+            except Exception as e:
+                stats.fetch.record(0, time.perf_counter() - start, errors=1)
+                stats.add_error('fetch', key, e)
+                continue
+            stats.fetch.record(1, time.perf_counter() - start)
+            fetched.put((key, data))
+
+    def _transform_dispatcher(self, fetched: queue.Queue, transformed: queue.Queue, stats: PipelineStats):
+        """Batch fetched items and keep at most two batches per transform worker in flight.
+
+        The load workers are always told to stop, even if dispatching fails, so `run()` cannot hang.
+        """
+        try:
+            self._dispatch_batches(fetched, transformed, stats)
+        finally:
+            for _ in range(self.load_workers):
+                transformed.put(_DONE)
+
+    def _dispatch_batches(self, fetched: queue.Queue, transformed: queue.Queue, stats: PipelineStats):
+        in_flight = {}  # Future -> the batch it transforms, so a failed batch can report its keys
+
+        def fail_batch(batch, error):
+            stats.transform.record(0, 0.0, errors=len(batch))
+            for key, _ in batch:
+                stats.add_error('transform', key, error)
+
+        def drain(return_when, timeout=None):
+            done, _ = wait(in_flight, timeout=timeout, return_when=return_when)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    results, errors, seconds = future.result()
+                except Exception as e:  # e.g. a transform that cannot be pickled for a process pool
+                    fail_batch(batch, e)
+                    continue
+                stats.transform.record(len(results), seconds, errors=len(errors))
+                for key, error in errors:
+                    stats.add_error('transform', key, error)
+                for item in results:
+                    transformed.put(item)
+
+        with self._make_executor() as executor:
+            batch = []
+            while True:
+                try:
+                    item = fetched.get(timeout=0.05)
+                except queue.Empty:
+                    item = None
+                if item is not None and item is not _DONE:
+                    batch.append(item)
+                if batch and (len(batch) >= self.batch_size or item is _DONE):
+                    if len(in_flight) >= 2 * self.transform_workers:
+                        drain(FIRST_COMPLETED)
+                    try:
+                        in_flight[executor.submit(_apply_transforms, self.transforms, batch)] = batch
+                    except Exception as e:  # e.g. a broken process pool
+                        fail_batch(batch, e)
+                    batch = []
+                # Hand finished batches to the sink as soon as they are ready
+                if in_flight:
+                    drain(ALL_COMPLETED, timeout=0)
+                if item is _DONE:
+                    break
+            if in_flight:
+                drain(ALL_COMPLETED)
+
+    def _load_worker(self, transformed: queue.Queue, stats: PipelineStats):
+        while True:
+            item = transformed.get()
+            if item is _DONE:
+                return
+            key, data = item
+            output_key = key
+            start = time.perf_counter()
+            try:
+                output_key = self.output_key(key)
+                self.sink.load(data, output_key)
+            except Exception as e:
+                stats.load.record(0, time.perf_counter() - start, errors=1)
+                stats.add_error('load', output_key, e)
+                continue
+            stats.load.record(1, time.perf_counter() - start)
@@ -0,0 +1,58 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Optional
+
+DEFAULT_MAX_POOL_CONNECTIONS = 100
+DEFAULT_CONCURRENCY = 50
+
+
+def create_s3_client(max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS, **client_kwargs):
+    """Return an async context manager yielding an aiobotocore S3 client with a connection pool of the given size.
+
+    Enter it once and pass the client to several AsyncS3Source / AsyncS3Sink instances so they share
+    one pool of keep-alive connections. aiobotocore is imported here so the async connectors can be
+    imported, and used with a client passed in, without it.
+    """
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+
+    config = AioConfig(max_pool_connections=max_pool_connections)
+    return get_session().create_client('s3', config=config, **client_kwargs)
+
+
+class AsyncS3Client:
+    """Base for the async S3 connectors: holds a shared aiobotocore client, or lazily creates its own.
+
+    A client passed in is not closed with the connector; one created here is closed by `close()`.
+    """
+
+    def __init__(self, bucket_name: str, s3_client=None,
+                 max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+        self.bucket_name = bucket_name
+        self.s3_client = s3_client
+        self.max_pool_connections = max_pool_connections
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self):
+        if self.s3_client is None:
+            async with self._client_lock:
+                if self.s3_client is None:
+                    self._exit_stack = AsyncExitStack()
+                    self.s3_client = await self._exit_stack.enter_async_context(
+                        create_s3_client(self.max_pool_connections))
+        return self.s3_client
+
+    async def __aenter__(self):
+        await self._get_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """Close the client if this connector created it."""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self.s3_client = None
@@ -0,0 +1,41 @@
+import asyncio
+from io import BytesIO
+from typing import TypeVar, Generic, Iterable, Optional, Tuple
+
+from connectors import formats
+from connectors.s3.async_s3_client import AsyncS3Client, DEFAULT_CONCURRENCY
+from connectors.sink import Sink
+
+T = TypeVar('T')
+
+
+class AsyncS3Sink(AsyncS3Client, Sink[T], Generic[T]):
+    """Asyncio counterpart of S3Sink on aiobotocore, with the same codec dispatch.
+
+    Encoding runs in a worker thread and the upload on the event loop.
+    """
+
+    async def load(self, data: T, key: str, codec: Optional[str] = None):
+        """Upload data to S3, encoded by the codec named `codec` or else the one for the key's extension."""
+        codec = formats.codec_for_key(key, codec)
+        buffer = BytesIO()
+        await asyncio.to_thread(codec.write, data, buffer)
+        s3_client = await self._get_client()
+        await s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=buffer.getvalue(),
+                                   ContentType=codec.content_type)
+
+    async def load_many(self, items: Iterable[Tuple[T, str]], concurrency: int = DEFAULT_CONCURRENCY,
+                        return_exceptions: bool = False, **load_kwargs) -> list:
+        """Upload (data, key) pairs with at most `concurrency` requests in flight.
+
+        Returns one result per item in order: None on success or, with `return_exceptions=True`, the
+        exception of a failed upload instead of raising it.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def load_one(data: T, key: str):
+            async with semaphore:
+                await self.load(data, key, **load_kwargs)
+
+        return await asyncio.gather(*(load_one(data, key) for data, key in items),
+                                    return_exceptions=return_exceptions)
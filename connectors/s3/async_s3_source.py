@@ -0,0 +1,55 @@
+import asyncio
+from io import BytesIO
+from typing import TypeVar, Generic, Iterable, List, Optional
+
+from connectors import formats
+from connectors.s3.async_s3_client import AsyncS3Client, DEFAULT_CONCURRENCY
+from connectors.s3.s3_source import S3Source
+from connectors.source import Source
+
+T = TypeVar('T')
+
+
+class AsyncS3Source(AsyncS3Client, Source[T], Generic[T]):
+    """Asyncio counterpart of S3Source on aiobotocore, with the same codec dispatch.
+
+    Downloads run on the event loop while decoding runs in a worker thread, so fetches can be mixed
+    with HttpSource requests in one asyncio pipeline without blocking it.
+    """
+
+    async def _get_s3_object(self, key: str) -> bytes:
+        """Helper method to retrieve raw data from S3."""
+        s3_client = await self._get_client()
+        response = await s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        async with response['Body'] as body:
+            return await body.read()
+
+    async def fetch(self, key: str, codec: Optional[str] = None) -> T:
+        """Extract data from S3 and return it as the specified type T, decoded by `codec` or the key's extension."""
+        file_format = formats.codec_for_key(key, codec).name
+        raw_data = await self._get_s3_object(key)
+        data = await asyncio.to_thread(formats.read, BytesIO(raw_data), file_format)
+        return S3Source._convert_output(data)
+
+    async def fetch_many(self, keys: Iterable[str], concurrency: int = DEFAULT_CONCURRENCY,
+                         return_exceptions: bool = False, **fetch_kwargs) -> list:
+        """Fetch several keys with at most `concurrency` requests in flight, returning results in key order.
+
+        With `return_exceptions=True` a failed key yields its exception in place of the data instead of raising.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_one(key: str):
+            async with semaphore:
+                return await self.fetch(key, **fetch_kwargs)
+
+        return await asyncio.gather(*(fetch_one(key) for key in keys), return_exceptions=return_exceptions)
+
+    async def list(self, prefix: str = '') -> List[str]:
+        """List all keys in the S3 bucket or within a specific folder (prefix)."""
+        s3_client = await self._get_client()
+        keys = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        async for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            keys.extend(content['Key'] for content in page.get('Contents', []))
+        return keys
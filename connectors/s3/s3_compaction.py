@@ -0,0 +1,255 @@
+import argparse
+import datetime
+import json
+import logging
+import posixpath
+import uuid
+from typing import Dict, List, Optional
+
+import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from connectors.s3.s3_sink import S3Sink, DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_ROWS_PER_FILE
+from connectors.s3.s3_source import S3Source
+
+MANIFEST_NAME = '_manifest.json'
+COMPACTED_FILE_PREFIX = 'compacted-'
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+# delete_objects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+# Uncommitted compacted files younger than this may belong to a run that is still in progress
+DEFAULT_ORPHAN_GRACE_PERIOD = datetime.timedelta(hours=6)
+# Committed compacted files smaller than this are merged again with the next run's new files
+DEFAULT_MIN_FILE_BYTES = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class S3Compactor:
+    """Merge the many small Parquet files under a prefix into a few large ones.
+
+    Compacted files are written next to the originals as `compacted-<id>-<n>.parquet` and only become
+    live once `<prefix>/_manifest.json` is rewritten to list them, so a failed run never exposes partial
+    output (uncommitted files older than `orphan_grace_period` are cleaned up by a later run). The
+    manifest also records which source files it covers, which makes `compact` idempotent: re-running it
+    only picks up files that arrived since the last run, and finishes deleting or archiving originals a
+    previous run did not get to. Deleted originals are dropped from the manifest again so it stays small,
+    and committed files below `min_file_bytes` are folded into the next merge so scheduled runs do not
+    leave one small compacted file per run.
+    A sub-prefix with its own manifest is compacted separately and left alone when compacting a parent.
+    Readers that keep the originals should use `list_live` instead of listing the prefix.
+    """
+
+    def __init__(self, bucket_name: str, s3_client=None, max_workers: int = DEFAULT_MAX_CONCURRENCY):
+        self.bucket_name = bucket_name
+        self.s3_client = s3_client or boto3.client('s3')
+        self.source = S3Source(bucket_name, s3_client=self.s3_client)
+        self.sink = S3Sink(bucket_name, s3_client=self.s3_client)
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _normalize_prefix(prefix: str) -> str:
+        return prefix.rstrip('/') + '/'
+
+    def read_manifest(self, prefix: str) -> dict:
+        """Return the manifest for a prefix, or an empty one if it has not been compacted yet."""
+        key = self._normalize_prefix(prefix) + MANIFEST_NAME
+        try:
+            return self.source.fetch(key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return {'files': [], 'sources': []}
+
+    def list_live(self, prefix: str) -> List[str]:
+        """List the Parquet keys that make up the current data under a prefix.
+
+        These are the committed compacted files plus any original file not covered by the manifest,
+        and the live files of any sub-prefix with its own manifest.
+        """
+        prefix = self._normalize_prefix(prefix)
+        manifest = self.read_manifest(prefix)
+        compacted = set(manifest['files'])
+        covered = set(manifest['sources'])
+        keys = [obj['Key'] for obj in self._list_objects(prefix)]
+        nested = self._nested_manifest_prefixes(prefix, keys)
+        live = manifest['files'] + [key for key in keys
+                                    if key.endswith('.parquet') and key not in covered and key not in compacted
+                                    and not self._is_compacted_file(key) and self._owner(prefix, key, nested) is None]
+        for nested_prefix in nested:
+            if self._owner(prefix, nested_prefix, nested - {nested_prefix}) is None:
+                live.extend(self.list_live(nested_prefix))
+        return live
+
+    @staticmethod
+    def _is_compacted_file(key: str) -> bool:
+        return posixpath.basename(key).startswith(COMPACTED_FILE_PREFIX)
+
+    def _list_objects(self, prefix: str) -> List[Dict]:
+        """List the objects under a prefix with their metadata."""
+        objects = []
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            objects.extend(page.get('Contents', []))
+        return objects
+
+    @staticmethod
+    def _nested_manifest_prefixes(prefix: str, keys: List[str]) -> set:
+        """Return the sub-prefixes of `prefix` that have a manifest of their own."""
+        return {posixpath.dirname(key) + '/' for key in keys
+                if posixpath.basename(key) == MANIFEST_NAME and posixpath.dirname(key) + '/' != prefix}
+
+    @staticmethod
+    def _owner(prefix: str, key: str, nested: set) -> Optional[str]:
+        """Return the nested manifest prefix a key below `prefix` belongs to, or None if it is `prefix`'s own."""
+        directory = posixpath.dirname(key.rstrip('/')) + '/'
+        while len(directory) > len(prefix):
+            if directory in nested:
+                return directory
+            directory = posixpath.dirname(directory.rstrip('/')) + '/'
+        return None
+
+    def compact(self, prefix: str, max_rows_per_file: int = DEFAULT_MAX_ROWS_PER_FILE,
+                row_group_size: int = DEFAULT_ROW_GROUP_SIZE, compression: str = 'snappy',
+                delete_originals: bool = False, archive_prefix: Optional[str] = None,
+                orphan_grace_period: datetime.timedelta = DEFAULT_ORPHAN_GRACE_PERIOD,
+                min_file_bytes: int = DEFAULT_MIN_FILE_BYTES) -> dict:
+        """Compact the small Parquet files under `prefix` and return the updated manifest.
+
+        When `archive_prefix` is given the originals are copied there before being removed;
+        `delete_originals` removes them without a copy. Files under a sub-prefix with its own
+        manifest are skipped, and uncommitted compacted files are only deleted once they are
+        older than `orphan_grace_period`, so a concurrent run's output is not removed before it commits.
+        Committed files smaller than `min_file_bytes` are rewritten together with the new files (0
+        disables this); the replaced files are left for the orphan cleanup, so readers holding the
+        previous manifest can still read them.
+        """
+        prefix = self._normalize_prefix(prefix)
+        if archive_prefix is not None and self._normalize_prefix(archive_prefix).startswith(prefix):
+            raise ValueError(f"archive_prefix must not be inside the compacted prefix: {archive_prefix}")
+        manifest = self.read_manifest(prefix)
+        compacted = set(manifest['files'])
+        covered = set(manifest['sources'])
+
+        objects = self._list_objects(prefix)
+        nested = self._nested_manifest_prefixes(prefix, [obj['Key'] for obj in objects])
+        objects = [obj for obj in objects
+                   if obj['Key'].endswith('.parquet') and self._owner(prefix, obj['Key'], nested) is None]
+        sizes = {obj['Key']: obj['Size'] for obj in objects}
+        keys = set(sizes)
+        # Compacted files are only ever written directly under the prefix they belong to
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - orphan_grace_period
+        orphans = [obj['Key'] for obj in objects
+                   if self._is_compacted_file(obj['Key']) and posixpath.dirname(obj['Key']) + '/' == prefix
+                   and obj['Key'] not in compacted and obj['LastModified'] <= cutoff]
+        new_sources = [obj['Key'] for obj in objects
+                       if not self._is_compacted_file(obj['Key']) and obj['Key'] not in covered
+                       and obj['Key'] not in compacted]
+        failed = self._delete(orphans)
+        if failed:
+            logger.warning(f"Could not delete {len(failed)} uncommitted files under {prefix}")
+
+        # Undersized committed files are only worth rewriting if that reduces the number of files
+        undersized = [key for key in manifest['files'] if sizes.get(key, 0) < min_file_bytes]
+        if not new_sources and len(undersized) < 2:
+            undersized = []
+
+        # Sources that no longer exist were deleted or archived by an earlier run
+        sources = [key for key in manifest['sources'] if key in keys]
+        if new_sources or undersized or len(sources) != len(manifest['sources']):
+            new_files = []
+            if new_sources or undersized:
+                tables = self.source.fetch_many(undersized + new_sources, max_workers=self.max_workers,
+                                                as_arrow=True)
+                table = pa.concat_tables([table.replace_schema_metadata(None) for table in tables],
+                                         promote_options='permissive')
+                new_files = self._write_files(table, prefix, max_rows_per_file, row_group_size, compression)
+            files = [key for key in manifest['files'] if key not in set(undersized)] + new_files
+            # Writing the manifest is the commit point that swaps the compacted files in
+            manifest = self._write_manifest(prefix, files, sources + new_sources)
+
+        if (archive_prefix is not None or delete_originals) and manifest['sources']:
+            originals = manifest['sources']
+            if archive_prefix is not None:
+                self._archive(originals, prefix, archive_prefix)
+            # Originals that failed to delete stay covered, or the next run would compact them twice
+            failed = self._delete(originals)
+            if failed:
+                logger.warning(f"Could not delete {len(failed)} originals under {prefix}")
+            manifest = self._write_manifest(prefix, manifest['files'],
+                                            [key for key in originals if key in failed])
+
+        return manifest
+
+    def _write_manifest(self, prefix: str, files: List[str], sources: List[str]) -> dict:
+        manifest = {
+            'files': files,
+            'sources': sources,
+            'updated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        self.sink.load(manifest, prefix + MANIFEST_NAME)
+        return manifest
+
+    def _write_files(self, table: pa.Table, prefix: str, max_rows_per_file: int,
+                     row_group_size: int, compression: str) -> List[str]:
+        """Write a table as Parquet files of at most `max_rows_per_file` rows and return their keys."""
+        run_id = uuid.uuid4().hex
+        keys = []
+        for index, start in enumerate(range(0, table.num_rows, max_rows_per_file)):
+            key = f"{prefix}{COMPACTED_FILE_PREFIX}{run_id}-{index:05d}.parquet"
+            with self.sink.open_writer(key) as writer:
+                pq.write_table(table.slice(start, max_rows_per_file), writer,
+                               row_group_size=row_group_size, compression=compression)
+            keys.append(key)
+        return keys
+
+    def _archive(self, keys: List[str], prefix: str, archive_prefix: str):
+        """Copy keys under `archive_prefix`, keeping their path relative to `prefix`."""
+        archive_prefix = self._normalize_prefix(archive_prefix)
+        for key in keys:
+            self.s3_client.copy_object(Bucket=self.bucket_name, Key=archive_prefix + key.removeprefix(prefix),
+                                       CopySource={'Bucket': self.bucket_name, 'Key': key})
+
+    def _delete(self, keys: List[str]) -> set:
+        """Delete keys in batches and return the keys S3 reported as not deleted."""
+        failed = set()
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name, Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True})
+            for error in response.get('Errors', []):
+                logger.warning(f"Failed to delete {error['Key']}: {error.get('Code')} {error.get('Message')}")
+                failed.add(error['Key'])
+        return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact small Parquet files under an S3 prefix.")
+    parser.add_argument('--bucket', required=True, help="S3 bucket name")
+    parser.add_argument('--prefix', required=True, action='append',
+                        help="Prefix to compact (e.g. news-articles/20240101-openai-gpt-4o/); may be repeated")
+    parser.add_argument('--max-rows-per-file', type=int, default=DEFAULT_MAX_ROWS_PER_FILE)
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    parser.add_argument('--compression', default='snappy')
+    parser.add_argument('--delete-originals', action='store_true', help="Delete the compacted originals")
+    parser.add_argument('--archive-prefix', help="Copy the originals under this prefix before deleting them")
+    parser.add_argument('--orphan-grace-hours', type=float,
+                        default=DEFAULT_ORPHAN_GRACE_PERIOD.total_seconds() / 3600,
+                        help="Only delete uncommitted compacted files older than this")
+    parser.add_argument('--min-file-bytes', type=int, default=DEFAULT_MIN_FILE_BYTES,
+                        help="Merge committed files smaller than this again with new files (0 disables)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    compactor = S3Compactor(args.bucket)
+    for prefix in args.prefix:
+        manifest = compactor.compact(prefix, max_rows_per_file=args.max_rows_per_file,
+                                     row_group_size=args.row_group_size, compression=args.compression,
+                                     delete_originals=args.delete_originals, archive_prefix=args.archive_prefix,
+                                     orphan_grace_period=datetime.timedelta(hours=args.orphan_grace_hours),
+                                     min_file_bytes=args.min_file_bytes)
+        logger.info(json.dumps({'prefix': prefix, 'files': len(manifest['files']),
+                                'sources': len(manifest['sources'])}))
+
+
+if __name__ == '__main__':
+    main()
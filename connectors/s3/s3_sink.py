@@ -2,78 +2,304 @@ from typing import TypeVar
 
 T = TypeVar('T')
 
-import json
+import io
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from io import BytesIO
-from typing import TypeVar, Generic, List, Union
+from typing import TypeVar, Generic, List, Optional, Union
+from urllib.parse import quote
 
 import boto3
 import pandas as pd
 import pyarrow.parquet as pq
 import pyarrow as pa
 
+from connectors import formats
 from connectors.sink import Sink
 
 T = TypeVar('T')
 
+# S3 rejects multipart parts (other than the last) smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_CHUNK_ROWS = 100000
+DEFAULT_MAX_ROWS_PER_FILE = 1000000
+# Same placeholder Hive, Athena and pyarrow use for null partition values
+HIVE_DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Writable file object that streams bytes to S3 as a multipart upload.
+
+    Bytes are buffered until `part_size` is reached and each full part is uploaded on a thread pool
+    with at most `max_concurrency` parts in flight, so memory stays bounded at roughly
+    `part_size * (max_concurrency + 1)`. Closing the writer completes the upload; objects smaller than
+    one part are sent with a single `put_object` instead. Leaving a `with` block on an exception, closing
+    after a failed write, or dropping the writer without closing it aborts the upload instead.
+    """
+
+    def __init__(self, s3_client, bucket_name: str, key: str, content_type: str = 'application/octet-stream',
+                 part_size: int = DEFAULT_PART_SIZE, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes, got {part_size}")
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.max_concurrency = max(1, max_concurrency)
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id = None
+        self._executor = None
+        self._pending = set()
+        self._parts = []
+        self._failed = False
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed S3MultipartWriter")
+        try:
+            self._buffer += data
+            self._position += len(data)
+            while len(self._buffer) >= self.part_size:
+                part = bytes(self._buffer[:self.part_size])
+                del self._buffer[:self.part_size]
+                self._submit_part(part)
+        except BaseException:
+            # A lost part must never be completed into a truncated object
+            self._failed = True
+            raise
+        return len(data)
+
+    def _submit_part(self, body: bytes):
+        """Upload a part in the background, waiting first if too many parts are in flight."""
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=self.key,
+                                                              ContentType=self.content_type)
+            self._upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        while len(self._pending) >= self.max_concurrency:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                self._parts.append(future.result())
+
+        part_number = len(self._parts) + len(self._pending) + 1
+        self._pending.add(self._executor.submit(self._upload_part, part_number, body))
+
+    def _upload_part(self, part_number: int, body: bytes) -> dict:
+        response = self.s3_client.upload_part(Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id,
+                                              PartNumber=part_number, Body=body)
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def close(self):
+        """Flush the remaining bytes and complete the upload, or abort it if a write failed."""
+        if self.closed:
+            return
+        if self._failed:
+            self.abort()
+            return
+        try:
+            if self._upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=self.key, Body=bytes(self._buffer),
+                                          ContentType=self.content_type)
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                for future in self._pending:
+                    self._parts.append(future.result())
+                self._pending = set()
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={'Parts': sorted(self._parts, key=lambda part: part['PartNumber'])})
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._shutdown()
+            super().close()
+
+    def abort(self):
+        """Abort the multipart upload, discarding any parts already uploaded."""
+        if self._upload_id is not None:
+            for future in self._pending:
+                future.cancel()
+            self._shutdown()
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+        self._buffer = bytearray()
+        super().close()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # IOBase.__del__ would close() and so complete an upload that was never finished explicitly.
+        # In-flight parts keep the writer alive, so this can run on a worker thread that must not be joined.
+        if not self.closed:
+            try:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                self.abort()
+            except Exception:
+                pass
+
 
 class S3Sink(Sink[T], Generic[T]):
     def __init__(self, bucket_name: str, s3_client=None):
         self.bucket_name = bucket_name
         self.s3_client = s3_client or boto3.client('s3')
 
-    def load(self, data: T, key: str):
-        """Upload data to S3 based on the file extension."""
-        if key.endswith('.csv'):
-            self._process_loading(data, 'csv', key)
-        elif key.endswith('.ndjson'):
-            self._process_loading(data, 'ndjson', key)
-        elif key.endswith('.json'):
-            self._process_loading(data, 'json', key)
-        elif key.endswith('.parquet'):
-            self._process_loading(data, 'parquet', key)
+    def load(self, data: T, key: str, codec: Optional[str] = None):
+        """Upload data to S3, encoded by the codec named `codec` or else the one for the key's extension."""
+        self._process_loading(data, formats.codec_for_key(key, codec).name, key)
+
+    def open_writer(self, key: str, content_type: str = 'application/octet-stream',
+                    part_size: int = DEFAULT_PART_SIZE,
+                    max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> S3MultipartWriter:
+        """Open a writable file object that streams to `key` as a multipart upload."""
+        return S3MultipartWriter(self.s3_client, self.bucket_name, key, content_type=content_type,
+                                 part_size=part_size, max_concurrency=max_concurrency)
+
+    def load_multipart(self, data: T, key: str, part_size: int = DEFAULT_PART_SIZE,
+                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                       codec: Optional[str] = None):
+        """Upload data to S3 with a streaming multipart upload based on the file extension or `codec`.
+
+        The data is serialized `chunk_rows` rows at a time (Parquet row groups, CSV chunks or NDJSON
+        lines) straight into upload parts, so large frames never need a full in-memory copy of the
+        serialized object and serialization overlaps with part uploads. Other codecs (e.g. Arrow IPC
+        or compressed formats) are serialized whole into the upload.
+        """
+        codec = formats.codec_for_key(key, codec)
+        if codec.name == 'csv' and isinstance(data, pd.DataFrame):
+            write = self._write_csv
+        elif codec.name == 'ndjson' and isinstance(data, list):
+            write = self._write_ndjson
+        elif codec.name == 'json' and isinstance(data, (list, dict)):
+            write = self._write_json
+        elif codec.name == 'parquet' and isinstance(data, pd.DataFrame):
+            write = self._write_parquet
+        elif codec.name in ('csv', 'ndjson', 'json', 'parquet'):
+            raise TypeError(f"Unsupported data type for {codec.name}: {type(data)}")
+        else:
+            def write(data, writer, chunk_rows):
+                codec.write(data, writer)
+
+        with self.open_writer(key, codec.content_type, part_size=part_size,
+                              max_concurrency=max_concurrency) as writer:
+            write(data, writer, chunk_rows)
+
+    @staticmethod
+    def _write_csv(data: pd.DataFrame, writer, chunk_rows: int):
+        """Write a Pandas DataFrame as CSV chunks."""
+        for start in range(0, max(len(data), 1), chunk_rows):
+            chunk = data.iloc[start:start + chunk_rows]
+            writer.write(chunk.to_csv(index=False, header=start == 0).encode('utf-8'))
+
+    @staticmethod
+    def _write_ndjson(data: List[dict], writer, chunk_rows: int):
+        """Write a list of dicts as NDJSON lines."""
+        for start in range(0, len(data), chunk_rows):
+            lines = b"\n".join(formats.json_dumps(record) for record in data[start:start + chunk_rows])
+            writer.write((b"\n" if start else b"") + lines)
+
+    @staticmethod
+    def _write_json(data: Union[list, dict], writer, chunk_rows: int):
+        """Write JSON data; a JSON document cannot be chunked so it is encoded in one go."""
+        writer.write(formats.json_dumps(data))
+
+    @staticmethod
+    def _write_parquet(data: pd.DataFrame, writer, chunk_rows: int):
+        """Write a Pandas DataFrame as Parquet, one row group per chunk."""
+        schema = pa.Schema.from_pandas(data)
+        with pq.ParquetWriter(writer, schema) as parquet_writer:
+            for start in range(0, max(len(data), 1), chunk_rows):
+                table = pa.Table.from_pandas(data.iloc[start:start + chunk_rows], schema=schema)
+                parquet_writer.write_table(table)
+
+    def write_dataset(self, data: pd.DataFrame, base_prefix: str, partition_cols: Optional[List[str]] = None,
+                      max_rows_per_file: int = DEFAULT_MAX_ROWS_PER_FILE, row_group_size: Optional[int] = None,
+                      compression: str = 'snappy', max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> List[str]:
+        """Write a DataFrame as a hive-partitioned Parquet dataset under `base_prefix`.
+
+        Rows are grouped by `partition_cols` into `col=value/` prefixes (the partition columns are
+        stored in the path, not the files) and each partition is split into files of at most
+        `max_rows_per_file` rows. Files are named with a per-call id so repeated writes append to the
+        dataset instead of overwriting it. Returns the keys written.
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError(f"Unsupported data type for dataset: {type(data)}")
+        if max_rows_per_file < 1:
+            raise ValueError(f"max_rows_per_file must be positive, got {max_rows_per_file}")
+        partition_cols = partition_cols or []
+        missing = [col for col in partition_cols if col not in data.columns]
+        if missing:
+            raise ValueError(f"Partition columns not found in data: {missing}")
+
+        base_prefix = base_prefix.rstrip('/')
+        write_id = uuid.uuid4().hex
+        files = []
+        if partition_cols:
+            for values, group in data.groupby(partition_cols, dropna=False, sort=True):
+                values = values if isinstance(values, tuple) else (values,)
+                segments = [self._partition_segment(col, value) for col, value in zip(partition_cols, values)]
+                prefix = '/'.join(part for part in [base_prefix] + segments if part)
+                files.extend(self._split_files(group.drop(columns=partition_cols), prefix, write_id,
+                                               max_rows_per_file))
         else:
-            raise ValueError(f"Unsupported file type for key: {key}")
+            files.extend(self._split_files(data, base_prefix, write_id, max_rows_per_file))
+
+        def write_file(item):
+            key, frame = item
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            with self.open_writer(key) as writer:
+                pq.write_table(table, writer, row_group_size=row_group_size or max_rows_per_file,
+                               compression=compression)
+            return key
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(files) or 1))) as executor:
+            return list(executor.map(write_file, files))
+
+    @staticmethod
+    def _partition_segment(column: str, value) -> str:
+        """Build a hive-style `column=value` path segment."""
+        if pd.isna(value):
+            return f"{column}={HIVE_DEFAULT_PARTITION}"
+        return f"{column}={quote(str(value), safe='')}"
+
+    @staticmethod
+    def _split_files(data: pd.DataFrame, prefix: str, write_id: str, max_rows_per_file: int) -> list:
+        """Split a partition into (key, DataFrame) pairs of at most `max_rows_per_file` rows."""
+        return [('/'.join(part for part in (prefix, f"part-{write_id}-{index:05d}.parquet") if part),
+                 data.iloc[start:start + max_rows_per_file])
+                for index, start in enumerate(range(0, len(data), max_rows_per_file))]
 
     def _process_loading(self, data: T, file_format: str, key: str):
         """Process the data based on its format and upload it to S3."""
-        if file_format == 'csv' and isinstance(data, pd.DataFrame):
-            self._upload_csv(data, key)
-        elif file_format == 'ndjson' and isinstance(data, list):
-            self._upload_ndjson(data, key)
-        elif file_format == 'json' and isinstance(data, (list, dict)):
-            self._upload_json(data, key)
-        elif file_format == 'parquet' and isinstance(data, pd.DataFrame):
-            self._upload_parquet(data, key)
-        else:
-            raise TypeError(f"Unsupported data type for {file_format}: {type(data)}")
-
-    def _upload_csv(self, data: pd.DataFrame, key: str):
-        """Upload a Pandas DataFrame as a CSV to S3."""
-        csv_buffer = BytesIO()
-        data.to_csv(csv_buffer, index=False)
-        self._upload_to_s3(csv_buffer.getvalue(), key, 'text/csv')
-
-    def _upload_ndjson(self, data: List[dict], key: str):
-        """Upload a list of dicts as an NDJSON file to S3."""
-        ndjson_buffer = BytesIO("\n".join(json.dumps(record) for record in data).encode('utf-8'))
-        self._upload_to_s3(ndjson_buffer.getvalue(), key, 'application/x-ndjson')
-
-    def _upload_json(self, data: Union[list, dict], key: str):
-        """Upload JSON data to S3."""
-        json_buffer = BytesIO(json.dumps(data).encode('utf-8'))
-        self._upload_to_s3(json_buffer.getvalue(), key, 'application/json')
-
-    def _upload_parquet(self, data: pd.DataFrame, key: str):
-        """Upload a Pandas DataFrame as a Parquet file to S3."""
-        parquet_buffer = BytesIO()
-        # Create a PyArrow Table from the Pandas DataFrame
-        table = pa.Table.from_pandas(df=data)
-        # Write the table to the Parquet buffer
-        pq.write_table(table, parquet_buffer)
-        # Upload the buffer to S3
-        parquet_buffer.seek(0)  # Rewind the buffer before reading it
-        self._upload_to_s3(parquet_buffer.getvalue(), key, 'application/octet-stream')
-
-    def _upload_to_s3(self, body: bytes, key: str, content_type: str):
+        buffer = BytesIO()
+        codec = formats.get_codec(file_format)
+        codec.write(data, buffer)
+        buffer.seek(0)  # Upload straight from the buffer rather than a getvalue() copy
+        self._upload_to_s3(buffer, key, codec.content_type)
+
+    def _upload_to_s3(self, body: Union[bytes, BytesIO], key: str, content_type: str):
         """Helper method to upload raw data to S3."""
         self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=body, ContentType=content_type)
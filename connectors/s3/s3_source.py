@@ -1,16 +1,74 @@
+import io
 import json
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import TypeVar, Generic, List, Union
+from typing import TypeVar, Generic, Iterable, Iterator, List, Optional, Tuple, Union
 
 import boto3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 
+from connectors import formats
 from connectors.source import Source
 
 # Define the generic type variable T
 T = TypeVar('T')
 
+DEFAULT_BATCH_ROWS = 65536
+DEFAULT_RANGE_BUFFER_SIZE = 8 * 1024 * 1024
+# Matches botocore's default max_pool_connections so workers never wait on the HTTP pool
+DEFAULT_MAX_WORKERS = 10
+
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable, read-only file object over an S3 object that issues ranged GETs on demand."""
+
+    def __init__(self, s3_client, bucket_name: str, key: str, size: int = None):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+        if size is None:
+            size = s3_client.head_object(Bucket=bucket_name, Key=key)['ContentLength']
+        self.size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position: {position}")
+        self._position = position
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size or len(buffer) == 0:
+            return 0
+        end = min(self._position + len(buffer), self.size) - 1
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key,
+                                             Range=f"bytes={self._position}-{end}")
+        data = response['Body'].read()
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
 
 class S3Source(Source[T], Generic[T]):
     def __init__(self, bucket_name: str, s3_client=None):
@@ -22,46 +80,162 @@ class S3Source(Source[T], Generic[T]):
         response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
         return response['Body'].read()
 
-    def fetch(self, key: str) -> T:
-        """Extract data from S3 and return it as the specified type T."""
+    def fetch(self, key: str, columns: Optional[List[str]] = None,
+              filters: Optional[Union[List, pc.Expression]] = None, as_arrow: bool = False,
+              codec: Optional[str] = None) -> T:
+        """Extract data from S3 and return it as the specified type T.
+
+        The object is decoded by the codec named `codec`, or else the one registered for the key's
+        extension (see `connectors.formats`). For Parquet objects, `columns` and `filters` (DNF tuples or a pyarrow expression) are pushed
+        down so only the footer and the matching row groups / column chunks are fetched by range,
+        and `as_arrow=True` returns a pyarrow Table instead of a DataFrame.
+        """
+        file_format = formats.codec_for_key(key, codec).name
+        pushdown = columns is not None or filters is not None or as_arrow
+
+        if file_format == 'parquet' and pushdown:
+            return self._fetch_parquet(key, columns, filters, as_arrow)
+        elif pushdown:
+            raise ValueError(f"columns, filters and as_arrow are only supported for parquet, not {file_format}")
+
         raw_data = self._get_s3_object(key)
+        return self._process_extraction(raw_data, file_format)
 
-        # Infer file format based on file extension
-        if key.endswith('.csv'):
-            return self._process_extraction(raw_data, 'csv')
-        elif key.endswith('.ndjson'):
-            return self._process_extraction(raw_data, 'ndjson')
-        elif key.endswith('.json'):
-            return self._process_extraction(raw_data, 'json')
-        elif key.endswith('.parquet'):
-            return self._process_extraction(raw_data, 'parquet')
+    def _fetch_parquet(self, key: str, columns: Optional[List[str]],
+                       filters: Optional[Union[List, pc.Expression]], as_arrow: bool) -> T:
+        """Read a Parquet object, fetching only the byte ranges needed for the projection and filter."""
+        if columns is None and filters is None:
+            table = pq.read_table(BytesIO(self._get_s3_object(key)))
         else:
-            raise ValueError(f"Unsupported file type for key: {key}")
+            if filters is not None and not isinstance(filters, pc.Expression):
+                filters = pq.filters_to_expression(filters)
+            with pa.PythonFile(S3RangeReader(self.s3_client, self.bucket_name, key), mode='r') as source:
+                fragment = ds.ParquetFileFormat().make_fragment(source)
+                table = fragment.to_table(columns=columns, filter=filters)
 
-    def _process_extraction(self, raw_data: bytes, file_format: str) -> T:
-        """Process the raw data based on the file format and return it as type T."""
-        if file_format == 'csv':
-            df = pd.read_csv(BytesIO(raw_data))
-            return self._convert_output(df)
+        if as_arrow:
+            return self._convert_output(table)
+        return self._convert_output(table.to_pandas())
+
+    def fetch_many(self, keys: Iterable[str], max_workers: int = DEFAULT_MAX_WORKERS,
+                   concat: bool = False, return_exceptions: bool = False, **fetch_kwargs):
+        """Fetch several keys concurrently on a bounded thread pool.
+
+        Results are returned in key order. With `return_exceptions=True` a failed key yields its
+        exception in place of the data instead of raising. With `concat=True` the fetched
+        DataFrames are concatenated into a single DataFrame (failed keys are left out).
+        Extra keyword arguments such as `columns`, `filters` or `as_arrow` are passed to `fetch`.
+        """
+        keys = list(keys)
+
+        def fetch_one(key: str):
+            try:
+                return self.fetch(key, **fetch_kwargs)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        if keys:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keys)))) as executor:
+                results = list(executor.map(fetch_one, keys))
+        else:
+            results = []
+
+        if concat:
+            return self._concat_results([result for result in results if not isinstance(result, Exception)])
+        return results
+
+    @staticmethod
+    def _concat_results(results: List) -> Union[pd.DataFrame, pa.Table]:
+        """Concatenate fetched DataFrames (or Arrow tables) into a single DataFrame (or table)."""
+        if not results:
+            return pd.DataFrame()
+        if all(isinstance(result, pa.Table) for result in results):
+            return pa.concat_tables(results, promote_options='default')
+        if not all(isinstance(result, pd.DataFrame) for result in results):
+            raise TypeError("concat=True requires every fetched key to return a DataFrame or Arrow table")
+        return pd.concat(results, ignore_index=True)
 
+    def stream(self, key: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Yield the raw bytes of an S3 object in chunks as they arrive."""
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        body = response['Body']
+        try:
+            while True:
+                chunk = body.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    def fetch_iter(self, key: str, batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+        """Yield the object as DataFrames of at most `batch_rows` rows without buffering it whole.
+
+        Parquet is read through ranged GETs one record batch at a time, while CSV and NDJSON
+        are parsed incrementally from the streaming response body.
+        """
+        file_format = formats.infer_file_format(key)
+
+        if file_format == 'parquet':
+            yield from self._iter_parquet(key, batch_rows)
+        elif file_format == 'csv':
+            yield from self._iter_csv(key, batch_rows)
         elif file_format == 'ndjson':
-            df = pd.read_json(BytesIO(raw_data), lines=True)
-            return self._convert_output(df)
+            yield from self._iter_ndjson(key, batch_rows)
+        else:
+            raise ValueError(f"Streaming is not supported for file type: {file_format}")
+
+    def _iter_parquet(self, key: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield DataFrames from a Parquet object, fetching the footer and row groups by range."""
+        reader = io.BufferedReader(S3RangeReader(self.s3_client, self.bucket_name, key),
+                                   buffer_size=DEFAULT_RANGE_BUFFER_SIZE)
+        with pq.ParquetFile(reader) as parquet_file:
+            for batch in parquet_file.iter_batches(batch_size=batch_rows):
+                yield self._convert_output(batch.to_pandas())
 
-        elif file_format == 'json':
-            data = json.loads(raw_data.decode('utf-8'))
-            return self._convert_output(data)
+    def _iter_csv(self, key: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield DataFrames from a CSV object, parsing the streaming body in chunks."""
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        body = response['Body']
+        try:
+            for df in pd.read_csv(body, chunksize=batch_rows):
+                yield self._convert_output(df)
+        finally:
+            body.close()
+
+    def _iter_ndjson(self, key: str, batch_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield DataFrames from an NDJSON object, parsing the streaming body line by line."""
+        response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        body = response['Body']
+        try:
+            lines = []
+            for line in body.iter_lines():
+                if not line.strip():
+                    continue
+                lines.append(line)
+                if len(lines) >= batch_rows:
+                    yield self._convert_output(formats.read(BytesIO(b'\n'.join(lines)), 'ndjson'))
+                    lines = []
+            if lines:
+                yield self._convert_output(formats.read(BytesIO(b'\n'.join(lines)), 'ndjson'))
+        finally:
+            body.close()
 
-        elif file_format == 'parquet':
-            df = pq.read_table(BytesIO(raw_data)).to_pandas()
-            return self._convert_output(df)
+    def _process_extraction(self, raw_data: bytes, file_format: str) -> T:
+        """Process the raw data based on the file format and return it as type T."""
+        return self._convert_output(formats.read(BytesIO(raw_data), file_format))
 
     @staticmethod
-    def _convert_output(data: Union[pd.DataFrame, List[dict], dict]) -> T:
+    def _convert_output(data: Union[pd.DataFrame, pa.Table, List[dict], dict]) -> T:
         """Convert the extracted data into the desired return type T."""
         if isinstance(data, pd.DataFrame):
             return data  # Assume T is pd.DataFrame and return directly
 
+        elif isinstance(data, pa.Table):
+            return data  # Assume T is pa.Table and return directly
+
         elif isinstance(data, (list, dict)):
             return data  # Assume T is list or dict and return directly
 
@@ -69,9 +243,97 @@ class S3Source(Source[T], Generic[T]):
 
     def list(self, prefix: str = '') -> List[str]:
         """List all keys in the S3 bucket or within a specific folder (prefix)."""
+        return self._list_after(prefix)
+
+    def _list_after(self, prefix: str, start_after: Optional[str] = None) -> List[str]:
+        """List the keys under a prefix, skipping every key up to and including `start_after` server-side."""
         keys = []
+        paginate_kwargs = {'Bucket': self.bucket_name, 'Prefix': prefix}
+        if start_after is not None and start_after >= prefix:
+            paginate_kwargs['StartAfter'] = start_after
         paginator = self.s3_client.get_paginator('list_objects_v2')
-        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+        for page in paginator.paginate(**paginate_kwargs):
             if 'Contents' in page:
                 keys.extend([content['Key'] for content in page['Contents']])
         return keys
+
+    def list_since(self, prefix: str = '', checkpoint: Optional[Union[dict, str]] = None,
+                   sub_prefixes: Optional[Iterable[str]] = None,
+                   max_workers: int = DEFAULT_MAX_WORKERS) -> Tuple[List[str], Optional[dict]]:
+        """List only the keys added since `checkpoint` and return them with the new checkpoint.
+
+        The checkpoint records the greatest key seen so far and every key of its partition, the date
+        component of the first path segment under the prefix: the segment up to its first `-` (e.g.
+        `20240101` of `news-articles/20240101-gpt/slug_id/...`), so every model's folder for a day shares
+        one partition. Listing restarts at the beginning of that partition with `StartAfter` and skips the
+        keys already seen, so a key that arrives late but sorts before the greatest one of its partition
+        (including one from a model that sorts earlier) is still picked up, while the cost stays
+        proportional to one day plus the new keys. This relies on new partitions sorting after old ones;
+        keys that arrive in an earlier partition are missed. A bare key (an older checkpoint format)
+        counts every key up to it as seen. Seen keys are carried forward while the partition is
+        unchanged, even if this listing did not cover it.
+        Known `sub_prefixes` (e.g. date partitions under the prefix) are listed in parallel; sub-prefixes
+        wholly before the checkpoint's partition return nothing. Pass None to list everything. Persist
+        the returned checkpoint with `write_checkpoint` once the keys have been processed, under a key
+        outside the listed prefix.
+        """
+        if isinstance(checkpoint, str):
+            checkpoint = {'last_key': checkpoint}
+        last_key = checkpoint.get('last_key') if checkpoint else None
+        start_after = self._partition(prefix, last_key) if last_key is not None else None
+
+        if sub_prefixes is None:
+            listed = self._list_after(prefix, start_after)
+        else:
+            sub_prefixes = [f"{prefix}{sub_prefix}" for sub_prefix in sub_prefixes]
+            if sub_prefixes:
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sub_prefixes)))) as executor:
+                    pages = executor.map(lambda sub_prefix: self._list_after(sub_prefix, start_after),
+                                         sub_prefixes)
+                    listed = sorted({key for page in pages for key in page})
+            else:
+                listed = []
+
+        if last_key is None:
+            keys = listed
+        elif 'seen' in checkpoint:
+            seen = set(checkpoint['seen'])
+            keys = [key for key in listed if key not in seen]
+        else:
+            keys = [key for key in listed if key > last_key]
+
+        if listed:
+            last_key = max(listed[-1], last_key) if last_key is not None else listed[-1]
+        elif last_key is None:
+            return keys, None
+        partition = self._partition(prefix, last_key)
+        seen = {key for key in listed if key.startswith(partition)}
+        if checkpoint and partition == self._partition(prefix, checkpoint['last_key']):
+            # The listing may have skipped the partition (e.g. sub_prefixes omitting it), so keep what was seen
+            if 'seen' in checkpoint:
+                seen.update(checkpoint['seen'])
+            elif not seen:
+                return keys, {'last_key': last_key}
+        return keys, {'last_key': last_key, 'seen': sorted(seen)}
+
+    @staticmethod
+    def _partition(prefix: str, key: str) -> str:
+        """Return the prefix of the partition a key belongs to: `prefix` plus the date component of its first segment."""
+        relative = key[len(prefix):] if key.startswith(prefix) else key
+        if '/' not in relative:
+            return prefix
+        return f"{prefix}{relative.split('/', 1)[0].split('-', 1)[0]}"
+
+    def read_checkpoint(self, checkpoint_key: str) -> Optional[dict]:
+        """Read a checkpoint stored by `write_checkpoint`, or None if there is none yet."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=checkpoint_key)
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def write_checkpoint(self, checkpoint_key: str, checkpoint: Optional[dict]):
+        """Persist the checkpoint returned by `list_since` as a small JSON object."""
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=checkpoint_key,
+                                  Body=json.dumps(checkpoint).encode('utf-8'),
+                                  ContentType='application/json')
@@ -0,0 +1,109 @@
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import pandas as pd
+
+from connectors.s3.async_s3_sink import AsyncS3Sink
+from connectors.s3.async_s3_source import AsyncS3Source
+
+
+def _body(data: bytes) -> AsyncMock:
+    """A streaming body that behaves like aiobotocore's: an async context manager with `read()`."""
+    body = AsyncMock()
+    body.read.return_value = data
+    body.__aenter__.return_value = body
+    return body
+
+
+def _paginator(pages: list) -> MagicMock:
+    async def paginate(**kwargs):
+        for page in pages:
+            yield page
+
+    paginator = MagicMock()
+    paginator.paginate.side_effect = paginate
+    return paginator
+
+
+class TestAsyncS3Source(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.s3_client = AsyncMock()
+        self.objects = {
+            'data/a.json': b'{"col1": 1}',
+            'data/b.ndjson': b'{"col1": 1, "col2": "a"}\n{"col1": 2, "col2": "b"}',
+        }
+
+        async def get_object(Bucket, Key):
+            if Key not in self.objects:
+                raise KeyError(Key)
+            return {'Body': _body(self.objects[Key])}
+
+        self.s3_client.get_object.side_effect = get_object
+        self.source = AsyncS3Source('test-bucket', s3_client=self.s3_client)
+
+    async def test_fetch_decodes_by_extension(self):
+        self.assertEqual(await self.source.fetch('data/a.json'), {'col1': 1})
+        pd.testing.assert_frame_equal(await self.source.fetch('data/b.ndjson'),
+                                      pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']}))
+        self.s3_client.get_object.assert_any_await(Bucket='test-bucket', Key='data/a.json')
+
+    async def test_fetch_many_keeps_order_and_errors(self):
+        results = await self.source.fetch_many(['data/b.ndjson', 'data/missing.json', 'data/a.json'],
+                                               concurrency=2, return_exceptions=True)
+
+        self.assertEqual(len(results[0]), 2)
+        self.assertIsInstance(results[1], KeyError)
+        self.assertEqual(results[2], {'col1': 1})
+        with self.assertRaises(KeyError):
+            await self.source.fetch_many(['data/missing.json'])
+
+    async def test_list_reads_every_page(self):
+        paginator = _paginator([{'Contents': [{'Key': 'data/a.json'}, {'Key': 'data/b.ndjson'}]},
+                                {},
+                                {'Contents': [{'Key': 'data/c.csv'}]}])
+        self.s3_client.get_paginator = MagicMock(return_value=paginator)
+
+        self.assertEqual(await self.source.list('data/'), ['data/a.json', 'data/b.ndjson', 'data/c.csv'])
+        self.s3_client.get_paginator.assert_called_once_with('list_objects_v2')
+        paginator.paginate.assert_called_once_with(Bucket='test-bucket', Prefix='data/')
+
+    async def test_close_keeps_shared_client(self):
+        async with self.source:
+            pass
+        self.assertIs(self.source.s3_client, self.s3_client)
+
+
+class TestAsyncS3Sink(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.s3_client = AsyncMock()
+        self.sink = AsyncS3Sink('test-bucket', s3_client=self.s3_client)
+
+    async def test_load_encodes_by_extension(self):
+        await self.sink.load({'col1': 1}, 'out/a.json')
+
+        kwargs = self.s3_client.put_object.await_args.kwargs
+        self.assertEqual((kwargs['Bucket'], kwargs['Key'], kwargs['ContentType']),
+                         ('test-bucket', 'out/a.json', 'application/json'))
+        self.assertEqual(json.loads(kwargs['Body']), {'col1': 1})
+
+    async def test_load_many_returns_exceptions_in_order(self):
+        async def put_object(Bucket, Key, Body, ContentType):
+            if Key == 'out/bad.json':
+                raise IOError(Key)
+
+        self.s3_client.put_object.side_effect = put_object
+        items = [([{'col1': 1}], 'out/a.ndjson'), ({'col1': 2}, 'out/bad.json'), ({'col1': 3}, 'out/c.json')]
+
+        results = await self.sink.load_many(items, concurrency=2, return_exceptions=True)
+
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], IOError)
+        self.assertIsNone(results[2])
+        self.assertEqual(self.s3_client.put_object.await_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
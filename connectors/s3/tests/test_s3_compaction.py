@@ -0,0 +1,163 @@
+import datetime
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+import boto3
+import pandas as pd
+from moto import mock_aws
+
+from connectors.s3.s3_compaction import S3Compactor
+
+
+class TestS3Compactor(unittest.TestCase):
+
+    def setUp(self):
+        """Set up mock S3 environment and initialize the S3Compactor."""
+        self.mock_aws = mock_aws()
+        self.mock_aws.start()
+
+        self.bucket_name = 'test-bucket'
+        self.s3_client = boto3.client('s3', region_name='us-east-1')
+        self.s3_client.create_bucket(Bucket=self.bucket_name)
+        self.compactor = S3Compactor(bucket_name=self.bucket_name, s3_client=self.s3_client)
+        self.prefix = 'news-articles/20240101-openai-gpt-4o/'
+
+    def tearDown(self):
+        self.mock_aws.stop()
+
+    def _put_small_files(self, start: int, count: int, prefix: str = None):
+        """Write one single-row Parquet file per record, like the news consumer does."""
+        prefix = prefix or self.prefix
+        for i in range(start, start + count):
+            buffer = BytesIO()
+            pd.DataFrame([{'id': i, 'slug': f'issuer{i % 3}', 'tags': None if i % 2 else 'a, b'}]).to_parquet(buffer)
+            self.s3_client.put_object(Bucket=self.bucket_name, Body=buffer.getvalue(),
+                                      Key=f'{prefix}issuer{i % 3}_{i}/news_records_{i}.parquet')
+
+    def _read_ids(self, keys):
+        frames = []
+        for key in keys:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+            frames.append(pd.read_parquet(BytesIO(obj['Body'].read())))
+        return sorted(pd.concat(frames)['id'].tolist())
+
+    def _list(self, prefix: str):
+        return self.compactor.source.list(prefix)
+
+    def test_compact_merges_small_files(self):
+        """Test that small files are merged into compacted files listed by the manifest."""
+        self._put_small_files(0, 10)
+
+        manifest = self.compactor.compact(self.prefix, max_rows_per_file=4)
+
+        self.assertEqual(len(manifest['files']), 3)
+        self.assertEqual(len(manifest['sources']), 10)
+        self.assertEqual(self._read_ids(manifest['files']), list(range(10)))
+        self.assertEqual(self.compactor.list_live(self.prefix), manifest['files'])
+
+    def test_compact_is_idempotent_and_incremental(self):
+        """Test that re-running only compacts files that arrived since the last run."""
+        self._put_small_files(0, 5)
+        first = self.compactor.compact(self.prefix, min_file_bytes=0)
+        self.assertEqual(self.compactor.compact(self.prefix, min_file_bytes=0)['files'], first['files'])
+
+        self._put_small_files(5, 3)
+        second = self.compactor.compact(self.prefix, min_file_bytes=0)
+
+        self.assertEqual(len(second['files']), 2)
+        self.assertEqual(self._read_ids(self.compactor.list_live(self.prefix)), list(range(8)))
+
+    def test_compact_folds_undersized_files(self):
+        """Test that small committed files are merged again with newly arrived files."""
+        self._put_small_files(0, 5)
+        first = self.compactor.compact(self.prefix)
+        self.assertEqual(self.compactor.compact(self.prefix)['files'], first['files'])
+
+        self._put_small_files(5, 3)
+        second = self.compactor.compact(self.prefix)
+
+        self.assertEqual(len(second['files']), 1)
+        self.assertNotIn(first['files'][0], second['files'])
+        self.assertEqual(self._read_ids(second['files']), list(range(8)))
+        self.assertEqual(self._read_ids(self.compactor.list_live(self.prefix)), list(range(8)))
+
+    def test_compact_keeps_originals_that_failed_to_delete(self):
+        """Test that originals S3 could not delete stay covered by the manifest and are not compacted twice."""
+        self._put_small_files(0, 4)
+        stuck = f'{self.prefix}issuer0_0/news_records_0.parquet'
+        delete_objects = self.s3_client.delete_objects
+
+        def failing_delete_objects(Bucket, Delete):
+            objects = [obj for obj in Delete['Objects'] if obj['Key'] != stuck]
+            delete_objects(Bucket=Bucket, Delete={**Delete, 'Objects': objects})
+            failed = len(objects) != len(Delete['Objects'])
+            return {'Errors': [{'Key': stuck, 'Code': 'AccessDenied', 'Message': 'denied'}]} if failed else {}
+
+        with patch.object(self.s3_client, 'delete_objects', side_effect=failing_delete_objects):
+            manifest = self.compactor.compact(self.prefix, delete_originals=True)
+
+        self.assertEqual(manifest['sources'], [stuck])
+        self.assertEqual(self.compactor.compact(self.prefix, min_file_bytes=0)['files'], manifest['files'])
+        self.assertEqual(self._read_ids(self.compactor.list_live(self.prefix)), list(range(4)))
+
+    def test_compact_deletes_originals(self):
+        """Test that originals can be removed once the manifest is committed."""
+        self._put_small_files(0, 4)
+
+        manifest = self.compactor.compact(self.prefix, delete_originals=True)
+
+        remaining = [key for key in self._list(self.prefix) if key.endswith('.parquet')]
+        self.assertEqual(remaining, manifest['files'])
+        self.assertEqual(manifest['sources'], [])
+        self.assertEqual(self.compactor.read_manifest(self.prefix)['sources'], [])
+
+    def test_compact_archives_originals(self):
+        """Test that originals can be moved under an archive prefix."""
+        self._put_small_files(0, 4)
+
+        self.compactor.compact(self.prefix, archive_prefix='archive/20240101/')
+
+        self.assertEqual(len(self._list('archive/20240101/')), 4)
+        self.assertIn('archive/20240101/issuer0_0/news_records_0.parquet', self._list('archive/'))
+        with self.assertRaises(ValueError):
+            self.compactor.compact(self.prefix, archive_prefix=self.prefix + 'archive/')
+
+    def test_compact_cleans_up_uncommitted_files(self):
+        """Test that compacted files from a run that never committed its manifest are discarded."""
+        self._put_small_files(0, 2)
+        orphan = f'{self.prefix}compacted-deadbeef-00000.parquet'
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=orphan, Body=b'partial')
+
+        manifest = self.compactor.compact(self.prefix, orphan_grace_period=datetime.timedelta(0))
+
+        self.assertNotIn(orphan, self._list(self.prefix))
+        self.assertEqual(self._read_ids(manifest['files']), [0, 1])
+
+    def test_compact_keeps_recent_uncommitted_files(self):
+        """Test that compacted files younger than the grace period, e.g. of a concurrent run, are kept."""
+        self._put_small_files(0, 2)
+        in_progress = f'{self.prefix}compacted-cafebabe-00000.parquet'
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=in_progress, Body=b'partial')
+
+        self.compactor.compact(self.prefix)
+
+        self.assertIn(in_progress, self._list(self.prefix))
+
+    def test_compact_parent_of_compacted_prefix(self):
+        """Test that compacting a parent prefix leaves a separately compacted sub-prefix intact."""
+        parent = 'news-articles/'
+        self._put_small_files(0, 4)
+        self._put_small_files(4, 2, prefix='news-articles/20240102-openai-gpt-4o/')
+        child = self.compactor.compact(self.prefix, delete_originals=True)
+
+        manifest = self.compactor.compact(parent, delete_originals=True, orphan_grace_period=datetime.timedelta(0))
+
+        self.assertTrue(all(key in self._list(self.prefix) for key in child['files']))
+        self.assertEqual(self.compactor.read_manifest(self.prefix)['files'], child['files'])
+        self.assertEqual(self._read_ids(manifest['files']), [4, 5])
+        self.assertEqual(self._read_ids(self.compactor.list_live(parent)), list(range(6)))
+
+
+if __name__ == '__main__':
+    unittest.main()
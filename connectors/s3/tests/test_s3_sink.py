@@ -1,12 +1,21 @@
+import gc
+import gzip
 import json
+import os
+import tempfile
+import time
 import unittest
 from io import BytesIO
+from unittest.mock import patch
 
 import boto3
 import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 from moto import mock_aws
 
-from connectors.s3.s3_sink import S3Sink
+from connectors.s3.s3_sink import S3Sink, MIN_PART_SIZE
 
 class TestS3Sink(unittest.TestCase):
 
@@ -90,6 +99,151 @@ class TestS3Sink(unittest.TestCase):
         loaded_df = pd.read_parquet(parquet_data)
         pd.testing.assert_frame_equal(df, loaded_df)
 
+    def _large_df(self, rows: int = 120000) -> pd.DataFrame:
+        """A DataFrame whose serialized form spans several multipart parts."""
+        return pd.DataFrame({
+            'col1': range(rows),
+            'col2': [f'{i:032x}{i * 7919:032x}' for i in range(rows)],
+        })
+
+    def test_load_multipart_csv(self):
+        """Test streaming a large CSV through a multipart upload."""
+        df = self._large_df()
+        key = 'large.csv'
+        self.sink.load_multipart(df, key, part_size=MIN_PART_SIZE, chunk_rows=10000)
+
+        head = self.s3_client.head_object(Bucket=self.bucket_name, Key=key, PartNumber=1)
+        self.assertGreater(head['PartsCount'], 1)
+        obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        pd.testing.assert_frame_equal(pd.read_csv(BytesIO(obj['Body'].read())), df)
+
+    def test_load_multipart_parquet(self):
+        """Test streaming a large Parquet file through a multipart upload, one row group per chunk."""
+        df = self._large_df()
+        key = 'large.parquet'
+        self.sink.load_multipart(df, key, part_size=MIN_PART_SIZE, chunk_rows=30000)
+
+        obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
+        parquet_file = pq.ParquetFile(BytesIO(obj['Body'].read()))
+        self.assertEqual(parquet_file.num_row_groups, 4)
+        pd.testing.assert_frame_equal(parquet_file.read().to_pandas(), df)
+
+    def test_load_multipart_small_ndjson(self):
+        """Test that data smaller than one part is uploaded with a single request."""
+        data = [{'col1': i, 'col2': 'a'} for i in range(5)]
+        key = 'small.ndjson'
+        self.sink.load_multipart(data, key, chunk_rows=2)
+
+        lines = self._get_s3_object_content(key).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], data)
+
+    def test_upload_compressed_and_explicit_codec(self):
+        """Test uploading with a codec inferred from a compressed extension and one chosen explicitly."""
+        data = [{'col1': 1, 'col2': 'a'}, {'col1': 2, 'col2': 'b'}]
+        self.sink.load(data, 'test.ndjson.gz')
+        self.sink.load_multipart(pd.DataFrame(data), 'test.bin', codec='arrow')
+
+        obj = self.s3_client.get_object(Bucket=self.bucket_name, Key='test.ndjson.gz')
+        self.assertEqual(obj['ContentType'], 'application/gzip')
+        lines = gzip.decompress(obj['Body'].read()).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], data)
+
+        obj = self.s3_client.get_object(Bucket=self.bucket_name, Key='test.bin')
+        table = ipc.open_file(BytesIO(obj['Body'].read())).read_all()
+        pd.testing.assert_frame_equal(table.to_pandas(), pd.DataFrame(data))
+
+    def test_writer_aborts_on_error(self):
+        """Test that a failed streaming write aborts the upload and leaves no object behind."""
+        key = 'aborted.csv'
+        with self.assertRaises(RuntimeError):
+            with self.sink.open_writer(key, part_size=MIN_PART_SIZE) as writer:
+                writer.write(b'x' * (MIN_PART_SIZE + 1))
+                raise RuntimeError("serialization failed")
+
+        uploads = self.s3_client.list_multipart_uploads(Bucket=self.bucket_name)
+        self.assertEqual(uploads.get('Uploads', []), [])
+        self.assertNotIn('Contents', self.s3_client.list_objects_v2(Bucket=self.bucket_name))
+
+    def test_writer_aborts_when_dropped(self):
+        """Test that a writer garbage-collected without close() aborts instead of completing the upload."""
+        writer = self.sink.open_writer('dropped.csv', part_size=MIN_PART_SIZE)
+        writer.write(b'x' * (MIN_PART_SIZE + 1))
+        del writer
+
+        # The in-flight part holds the last reference, so the writer is collected once it finishes
+        deadline = time.monotonic() + 10
+        while True:
+            gc.collect()
+            uploads = self.s3_client.list_multipart_uploads(Bucket=self.bucket_name).get('Uploads', [])
+            if not uploads or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual(uploads, [])
+        self.assertNotIn('Contents', self.s3_client.list_objects_v2(Bucket=self.bucket_name))
+
+    def test_writer_aborts_after_failed_write(self):
+        """Test that closing after a failed part upload aborts rather than completing a truncated object."""
+        writer = self.sink.open_writer('failed.csv', part_size=MIN_PART_SIZE, max_concurrency=1)
+        with patch.object(self.s3_client, 'upload_part', side_effect=RuntimeError("upload failed")):
+            writer.write(b'x' * MIN_PART_SIZE)
+            with self.assertRaises(RuntimeError):
+                writer.write(b'x' * MIN_PART_SIZE)
+        writer.close()
+
+        uploads = self.s3_client.list_multipart_uploads(Bucket=self.bucket_name)
+        self.assertEqual(uploads.get('Uploads', []), [])
+        self.assertNotIn('Contents', self.s3_client.list_objects_v2(Bucket=self.bucket_name))
+
+    def test_part_size_too_small(self):
+        """Test that parts below the S3 minimum are rejected."""
+        with self.assertRaises(ValueError):
+            self.sink.open_writer('test.csv', part_size=1024)
+
+    def test_write_dataset_partitioned(self):
+        """Test writing a hive-partitioned Parquet dataset with bounded file sizes."""
+        df = pd.DataFrame({
+            'date': ['20240101'] * 5 + ['20240102'] * 2,
+            'model': ['gpt'] * 7,
+            'score': range(7),
+        })
+        keys = self.sink.write_dataset(df, 'news-articles/', partition_cols=['date', 'model'], max_rows_per_file=2)
+
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(sum(key.startswith('news-articles/date=20240101/model=gpt/') for key in keys), 3)
+        self.assertEqual(sum(key.startswith('news-articles/date=20240102/model=gpt/') for key in keys), 1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for key in keys:
+                path = os.path.join(tmp_dir, key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.s3_client.download_file(self.bucket_name, key, path)
+            dataset = ds.dataset(os.path.join(tmp_dir, 'news-articles'), format='parquet', partitioning='hive')
+            table = dataset.to_table(filter=ds.field('date') == 20240102)
+            self.assertEqual(sorted(table.column('score').to_pylist()), [5, 6])
+
+    def test_write_dataset_unpartitioned_and_null_values(self):
+        """Test writing a dataset without partitions and with a null partition value."""
+        df = pd.DataFrame({'issuer': ['a', None], 'score': [1, 2]})
+
+        self.assertEqual(len(self.sink.write_dataset(df, 'flat', max_rows_per_file=1)), 2)
+
+        keys = self.sink.write_dataset(df, 'by-issuer', partition_cols=['issuer'])
+        self.assertTrue(any('/issuer=__HIVE_DEFAULT_PARTITION__/' in key for key in keys))
+
+        with self.assertRaises(ValueError):
+            self.sink.write_dataset(df, 'by-issuer', partition_cols=['missing'])
+
+    def test_write_dataset_empty_prefix(self):
+        """Test that a dataset written at the bucket root has no leading slash in its keys."""
+        df = pd.DataFrame({'issuer': ['a', 'b'], 'score': [1, 2]})
+
+        flat_keys = self.sink.write_dataset(df, '')
+        partitioned_keys = self.sink.write_dataset(df, '/', partition_cols=['issuer'])
+
+        self.assertEqual(len(flat_keys), 1)
+        self.assertTrue(flat_keys[0].startswith('part-'))
+        self.assertEqual(sorted(key.split('/')[0] for key in partitioned_keys), ['issuer=a', 'issuer=b'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,16 @@
+import hashlib
 import json
 import unittest
 from io import BytesIO
 from typing import List
 from unittest.mock import MagicMock
 
+import boto3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from botocore.response import StreamingBody
+from moto import mock_aws
 
 from connectors.s3.s3_source import S3Source
 
@@ -64,6 +70,171 @@ class TestS3Source(unittest.TestCase):
         df = self.s3_source_df.fetch('data/file.parquet')
         pd.testing.assert_frame_equal(df, df_to_parquet)
 
+    def _mock_object(self, data: bytes):
+        """Serve `data` from the mock client as a streaming body, honouring ranged GETs."""
+        def get_object(Bucket, Key, Range=None):
+            chunk = data
+            if Range:
+                start, end = Range.removeprefix('bytes=').split('-')
+                chunk = data[int(start):int(end) + 1]
+            return {'Body': StreamingBody(BytesIO(chunk), len(chunk))}
+
+        self.mock_s3_client.get_object.side_effect = get_object
+        self.mock_s3_client.head_object.return_value = {'ContentLength': len(data)}
+
+    def test_fetch_iter_csv(self):
+        """Test streaming a CSV file from S3 in DataFrame chunks."""
+        self._mock_object(b"col1,col2\n1,2\n3,4\n5,6")
+
+        chunks = list(self.s3_source_df.fetch_iter('data/file.csv', batch_rows=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        pd.testing.assert_frame_equal(pd.concat(chunks),
+                                      pd.DataFrame({'col1': [1, 3, 5], 'col2': [2, 4, 6]}))
+
+    def test_fetch_iter_ndjson(self):
+        """Test streaming an NDJSON file from S3 in DataFrame chunks."""
+        self._mock_object(b'{"col1": 1}\n{"col1": 2}\n\n{"col1": 3}\n')
+
+        chunks = list(self.s3_source_df.fetch_iter('data/file.ndjson', batch_rows=2))
+
+        self.assertEqual([chunk['col1'].tolist() for chunk in chunks], [[1, 2], [3]])
+
+    def test_fetch_iter_ndjson_infers_dates(self):
+        """Test that streamed NDJSON chunks keep the datetime dtype of date-like columns."""
+        self._mock_object(b'{"created_at": "2024-01-01T00:00:00Z"}\n{"created_at": "2024-01-02T00:00:00Z"}\n')
+
+        chunk = next(self.s3_source_df.fetch_iter('data/file.ndjson', batch_rows=2))
+
+        self.assertEqual(str(chunk['created_at'].dtype), 'datetime64[ns, UTC]')
+
+    def test_fetch_iter_parquet_uses_ranged_gets(self):
+        """Test streaming a Parquet file from S3 in record batches read by range."""
+        df_to_parquet = pd.DataFrame({'col1': range(10), 'col2': [str(i) for i in range(10)]})
+        buffer = BytesIO()
+        df_to_parquet.to_parquet(buffer, row_group_size=4)
+        self._mock_object(buffer.getvalue())
+
+        chunks = list(self.s3_source_df.fetch_iter('data/file.parquet', batch_rows=4))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df_to_parquet)
+        for call in self.mock_s3_client.get_object.call_args_list:
+            self.assertIn('Range', call.kwargs)
+
+    def test_fetch_iter_json_unsupported(self):
+        """Test that streaming a plain JSON file is rejected."""
+        with self.assertRaises(ValueError):
+            list(self.s3_source_list.fetch_iter('data/file.json'))
+
+    def test_stream_raw_chunks(self):
+        """Test streaming the raw bytes of an object in fixed-size chunks."""
+        self._mock_object(b"abcdefghij")
+
+        chunks = list(self.s3_source_df.stream('data/file.bin', chunk_size=4))
+
+        self.assertEqual(chunks, [b"abcd", b"efgh", b"ij"])
+
+    def _mock_objects(self, objects: dict):
+        """Serve several keys from the mock client; missing keys raise like S3 would."""
+        def get_object(Bucket, Key):
+            if Key not in objects:
+                raise KeyError(Key)
+            return {'Body': BytesIO(objects[Key])}
+
+        self.mock_s3_client.get_object.side_effect = get_object
+
+    def test_fetch_many_in_key_order(self):
+        """Test fetching several keys concurrently returns results in key order."""
+        keys = [f'data/file{i}.csv' for i in range(20)]
+        self._mock_objects({key: f"col1\n{i}".encode() for i, key in enumerate(keys)})
+
+        results = self.s3_source_df.fetch_many(keys, max_workers=4)
+
+        self.assertEqual([df['col1'].iloc[0] for df in results], list(range(20)))
+
+    def test_fetch_many_concat(self):
+        """Test fetching several keys into one concatenated DataFrame."""
+        self._mock_objects({'a.csv': b"col1\n1\n2", 'b.csv': b"col1\n3"})
+
+        df = self.s3_source_df.fetch_many(['a.csv', 'b.csv'], concat=True)
+
+        pd.testing.assert_frame_equal(df, pd.DataFrame({'col1': [1, 2, 3]}))
+
+    def test_fetch_many_captures_errors(self):
+        """Test per-key error capture when fetching several keys."""
+        self._mock_objects({'a.csv': b"col1\n1", 'c.csv': b"col1\n3"})
+
+        results = self.s3_source_df.fetch_many(['a.csv', 'missing.csv', 'c.csv'], return_exceptions=True)
+        self.assertIsInstance(results[0], pd.DataFrame)
+        self.assertIsInstance(results[1], KeyError)
+        self.assertIsInstance(results[2], pd.DataFrame)
+
+        df = self.s3_source_df.fetch_many(['a.csv', 'missing.csv', 'c.csv'], concat=True, return_exceptions=True)
+        self.assertEqual(df['col1'].tolist(), [1, 3])
+
+        with self.assertRaises(KeyError):
+            self.s3_source_df.fetch_many(['a.csv', 'missing.csv'])
+
+    def test_fetch_many_empty(self):
+        """Test fetching no keys."""
+        self.assertEqual(self.s3_source_df.fetch_many([]), [])
+        self.assertTrue(self.s3_source_df.fetch_many([], concat=True).empty)
+
+    def _mock_parquet(self) -> pd.DataFrame:
+        """Serve a wide, multi row-group Parquet object from the mock client."""
+        df = pd.DataFrame({
+            'issuer': [f'issuer{i % 10}' for i in range(1000)],
+            'score': range(1000),
+            'body': [hashlib.sha512(str(i).encode()).hexdigest() for i in range(1000)],
+        })
+        buffer = BytesIO()
+        df.to_parquet(buffer, row_group_size=100)
+        self._mock_object(buffer.getvalue())
+        return df
+
+    def _fetched_bytes(self) -> int:
+        """Total number of bytes requested from the mock client by ranged GETs."""
+        total = 0
+        for call in self.mock_s3_client.get_object.call_args_list:
+            start, end = call.kwargs['Range'].removeprefix('bytes=').split('-')
+            total += int(end) - int(start) + 1
+        return total
+
+    def test_fetch_parquet_columns(self):
+        """Test fetching only some columns of a Parquet file by range."""
+        df = self._mock_parquet()
+
+        result = self.s3_source_df.fetch('data/file.parquet', columns=['issuer', 'score'])
+
+        pd.testing.assert_frame_equal(result, df[['issuer', 'score']])
+        self.assertLess(self._fetched_bytes(), self.mock_s3_client.head_object.return_value['ContentLength'])
+
+    def test_fetch_parquet_filters(self):
+        """Test pushing a filter down to the Parquet row groups."""
+        df = self._mock_parquet()
+
+        result = self.s3_source_df.fetch('data/file.parquet', columns=['score'], filters=[('score', '>=', 950)])
+        pd.testing.assert_frame_equal(result, df.loc[df['score'] >= 950, ['score']].reset_index(drop=True))
+
+        result = self.s3_source_df.fetch('data/file.parquet', filters=ds.field('issuer') == 'issuer3')
+        self.assertEqual(len(result), 100)
+        self.assertTrue((result['issuer'] == 'issuer3').all())
+
+    def test_fetch_parquet_as_arrow(self):
+        """Test fetching a Parquet file as an Arrow table."""
+        df = self._mock_parquet()
+
+        table = self.s3_source_df.fetch('data/file.parquet', as_arrow=True)
+
+        self.assertIsInstance(table, pa.Table)
+        self.assertEqual(table.num_rows, len(df))
+
+    def test_fetch_pushdown_requires_parquet(self):
+        """Test that column and filter pushdown is rejected for non-Parquet files."""
+        with self.assertRaises(ValueError):
+            self.s3_source_df.fetch('data/file.csv', columns=['col1'])
+
     def test_list_keys(self):
         """Test listing keys in the S3 bucket."""
         self.mock_s3_client.get_paginator.return_value.paginate.return_value = [
@@ -76,5 +247,89 @@ class TestS3Source(unittest.TestCase):
         self.assertEqual(keys, expected_keys)
 
 
+
+class TestS3SourceListSince(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a moto bucket with date-partitioned keys."""
+        self.mock_aws = mock_aws()
+        self.mock_aws.start()
+        self.bucket_name = 'test-bucket'
+        self.s3_client = boto3.client('s3', region_name='us-east-1')
+        self.s3_client.create_bucket(Bucket=self.bucket_name)
+        self.source = S3Source(self.bucket_name, s3_client=self.s3_client)
+        for key in ['news/20240101/a.json', 'news/20240101/b.json', 'news/20240102/a.json', 'other/x.json']:
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=b'{}')
+
+    def tearDown(self):
+        self.mock_aws.stop()
+
+    def test_list_since_checkpoint(self):
+        """Test that only keys after the checkpoint are listed and the checkpoint advances."""
+        keys, checkpoint = self.source.list_since('news/')
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(checkpoint, {'last_key': 'news/20240102/a.json', 'seen': ['news/20240102/a.json']})
+
+        self.s3_client.put_object(Bucket=self.bucket_name, Key='news/20240103/a.json', Body=b'{}')
+        keys, checkpoint = self.source.list_since('news/', checkpoint)
+        self.assertEqual(keys, ['news/20240103/a.json'])
+
+        self.assertEqual(self.source.list_since('news/', checkpoint), ([], checkpoint))
+        self.assertEqual(self.source.list_since('empty/'), ([], None))
+
+    def test_list_since_out_of_order_key(self):
+        """Test that a key arriving after the checkpoint but sorting before it in the same partition is listed."""
+        _, checkpoint = self.source.list_since('news/')
+
+        self.s3_client.put_object(Bucket=self.bucket_name, Key='news/20240102/0-late.json', Body=b'{}')
+        keys, checkpoint = self.source.list_since('news/', checkpoint)
+
+        self.assertEqual(keys, ['news/20240102/0-late.json'])
+        self.assertEqual(checkpoint['last_key'], 'news/20240102/a.json')
+        self.assertEqual(self.source.list_since('news/', checkpoint)[0], [])
+
+    def test_list_since_sub_prefixes(self):
+        """Test listing known sub-prefixes in parallel, skipping those before the checkpoint."""
+        keys, checkpoint = self.source.list_since('news/', 'news/20240101/a.json',
+                                                  sub_prefixes=['20240101/', '20240102/'])
+        self.assertEqual(keys, ['news/20240101/b.json', 'news/20240102/a.json'])
+        self.assertEqual(checkpoint['last_key'], 'news/20240102/a.json')
+
+        keys, _ = self.source.list_since('news/', checkpoint, sub_prefixes=['20240101/', '20240102/'])
+        self.assertEqual(keys, [])
+
+    def test_list_since_keeps_seen_keys_of_unlisted_partition(self):
+        """Test that keys already seen are not listed again after a listing that skipped their partition."""
+        _, checkpoint = self.source.list_since('news/')
+
+        keys, checkpoint = self.source.list_since('news/', checkpoint, sub_prefixes=[])
+        self.assertEqual(keys, [])
+        self.assertEqual(checkpoint['seen'], ['news/20240102/a.json'])
+
+        self.s3_client.put_object(Bucket=self.bucket_name, Key='news/20240102/b.json', Body=b'{}')
+        keys, checkpoint = self.source.list_since('news/', checkpoint, sub_prefixes=['20240103/'])
+        self.assertEqual(keys, [])
+        self.assertEqual(self.source.list_since('news/', checkpoint)[0], ['news/20240102/b.json'])
+
+    def test_list_since_same_day_from_earlier_model(self):
+        """Test that a same-day key under a model folder sorting before the checkpoint's is listed."""
+        self.s3_client.put_object(Bucket=self.bucket_name, Key='news/20240103-gpt/a.json', Body=b'{}')
+        _, checkpoint = self.source.list_since('news/')
+        self.assertEqual(checkpoint['last_key'], 'news/20240103-gpt/a.json')
+
+        self.s3_client.put_object(Bucket=self.bucket_name, Key='news/20240103-claude/a.json', Body=b'{}')
+        keys, checkpoint = self.source.list_since('news/', checkpoint)
+
+        self.assertEqual(keys, ['news/20240103-claude/a.json'])
+        self.assertEqual(checkpoint['last_key'], 'news/20240103-gpt/a.json')
+        self.assertEqual(self.source.list_since('news/', checkpoint)[0], [])
+
+    def test_checkpoint_round_trip(self):
+        """Test persisting and reading back a checkpoint."""
+        self.assertIsNone(self.source.read_checkpoint('checkpoints/news.json'))
+        _, checkpoint = self.source.list_since('news/')
+        self.source.write_checkpoint('checkpoints/news.json', checkpoint)
+        self.assertEqual(self.source.read_checkpoint('checkpoints/news.json'), checkpoint)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+from typing import Dict
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from connectors.snowflake.snowflake_client import (
+    QueryResultCache,
+    SnowflakeClient,
+    SnowflakeCredentials,
+    clear_client_cache,
+)
+
+
+class FakeQueryConnection:
+    """A dbapi connection whose async queries finish after a number of status polls given in their SQL.
+
+    `SELECT 3` completes on its third poll and returns `[(3,)]`; queries starting with `FAIL` error out
+    when they complete.
+    """
+
+    def __init__(self):
+        self.queries: Dict[str, str] = {}
+        self.polls: Dict[str, int] = {}
+        self.running = 0
+        self.max_running = 0
+
+    def cursor(self):
+        connection = self
+        cursor = MagicMock()
+
+        def execute_async(query):
+            cursor.sfqid = f"q{len(connection.queries)}"
+            connection.queries[cursor.sfqid] = query
+            connection.polls[cursor.sfqid] = 0
+            connection.running += 1
+            connection.max_running = max(connection.max_running, connection.running)
+
+        def get_results_from_sfqid(query_id):
+            cursor.fetchall.return_value = [(int(connection.queries[query_id].split()[-1]),)]
+
+        cursor.execute_async.side_effect = execute_async
+        cursor.get_results_from_sfqid.side_effect = get_results_from_sfqid
+        return cursor
+
+    def get_query_status_throw_if_error(self, query_id: str) -> str:
+        self.polls[query_id] += 1
+        query = self.queries[query_id]
+        if self.polls[query_id] < int(query.split()[-1]):
+            return 'RUNNING'
+        self.running -= 1
+        if query.startswith('FAIL'):
+            raise RuntimeError(f"Query {query_id} failed")
+        return 'SUCCESS'
+
+    @staticmethod
+    def is_still_running(status: str) -> bool:
+        return status == 'RUNNING'
+
+
+def _credentials() -> SnowflakeCredentials:
+    """Credentials with a freshly generated key, so clients can be built without connecting."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(encoding=serialization.Encoding.PEM,
+                            format=serialization.PrivateFormat.PKCS8,
+                            encryption_algorithm=serialization.NoEncryption()).decode()
+    return SnowflakeCredentials(
+        account='account', user='user', private_key=''.join(pem.splitlines()[1:-1]),
+        warehouse='warehouse', database='database', db_schema='schema')
+
+
+class TestQueryResultCache(unittest.TestCase):
+
+    def test_key_keeps_whitespace_inside_literals(self):
+        padded = QueryResultCache.make_key("SELECT * FROM t WHERE name = 'a  b'", None)
+        single = QueryResultCache.make_key("SELECT * FROM t WHERE name = 'a b'", None)
+        self.assertNotEqual(padded, single)
+
+    def test_key_ignores_trailing_semicolon_and_param_order(self):
+        self.assertEqual(QueryResultCache.make_key("SELECT :a, :b;\n", {'a': 1, 'b': 2}),
+                         QueryResultCache.make_key("SELECT :a, :b", {'b': 2, 'a': 1}))
+        self.assertNotEqual(QueryResultCache.make_key("SELECT :a", {'a': 1}),
+                            QueryResultCache.make_key("SELECT :a", {'a': 2}))
+
+    def test_ttl_and_lru_eviction(self):
+        cache = QueryResultCache(max_entries=2, ttl=60)
+        cache.put(('q1', '{}'), [1])
+        cache.put(('q2', '{}'), [2])
+        cache.get(('q1', '{}'))  # Mark as recently used
+        cache.put(('q3', '{}'), [3])
+
+        self.assertIsNone(cache.get(('q2', '{}')))
+        self.assertEqual(cache.get(('q1', '{}')), [1])
+
+        cache.ttl = -1
+        self.assertIsNone(cache.get(('q1', '{}')))
+
+
+class TestSnowflakeClientCached(unittest.TestCase):
+
+    def setUp(self):
+        self.creds = _credentials()
+
+    def tearDown(self):
+        clear_client_cache()
+
+    def test_cached_forwards_client_options(self):
+        """Test that cached() enables the result cache and keys clients on their options."""
+        plain = SnowflakeClient.cached(self.creds)
+        caching = SnowflakeClient.cached(self.creds, result_cache_size=10, result_cache_ttl=60)
+
+        self.assertIsNone(plain.result_cache)
+        self.assertEqual(caching.result_cache.max_entries, 10)
+        self.assertEqual(caching.result_cache.ttl, 60)
+        self.assertIs(SnowflakeClient.cached(self.creds, result_cache_size=10, result_cache_ttl=60), caching)
+        self.assertIs(SnowflakeClient.cached(self.creds), plain)
+
+
+class TestSnowflakeClientMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SnowflakeClient(_credentials())
+        self.connection = MagicMock()
+        self.client.engine = MagicMock()
+        self.client.engine.begin.return_value.__enter__.return_value = self.connection
+
+    def _executed(self) -> list:
+        return [' '.join(str(call.args[0]).split()) for call in self.connection.execute.call_args_list]
+
+    def test_large_frames_are_bulk_loaded_on_the_pinned_connection(self):
+        df = pd.DataFrame({'id': range(3)})
+        with patch('connectors.snowflake.snowflake_client.write_pandas',
+                   return_value=(True, 1, 3, [])) as mock_write, \
+                patch.object(pd.DataFrame, 'to_sql') as mock_to_sql:
+            self.client.merge(df, 'tmp', 'target', 'MERGE INTO target USING tmp', bulk_threshold=3)
+
+        mock_to_sql.assert_not_called()
+        mock_write.assert_called_once()
+        self.assertIs(mock_write.call_args.args[0], self.connection.connection.dbapi_connection)
+        self.assertEqual(mock_write.call_args.args[2], 'tmp')
+        self.assertEqual(self._executed(), ['DROP TABLE IF EXISTS tmp', 'CREATE TEMPORARY TABLE tmp LIKE target',
+                                            'MERGE INTO target USING tmp', 'DROP TABLE IF EXISTS tmp'])
+
+    def test_small_frames_use_row_inserts(self):
+        df = pd.DataFrame({'id': range(2)})
+        with patch('connectors.snowflake.snowflake_client.write_pandas') as mock_write, \
+                patch.object(pd.DataFrame, 'to_sql') as mock_to_sql:
+            self.client.merge(df, 'tmp', 'target', 'MERGE INTO target USING tmp', bulk_threshold=3)
+
+        mock_write.assert_not_called()
+        mock_to_sql.assert_called_once_with('tmp', self.connection, if_exists='append', index=False,
+                                            schema='schema')
+
+    def test_short_bulk_load_raises(self):
+        df = pd.DataFrame({'id': range(3)})
+        with patch('connectors.snowflake.snowflake_client.write_pandas', return_value=(True, 1, 2, [])):
+            with self.assertRaises(RuntimeError):
+                self.client.merge(df, 'tmp', 'target', 'MERGE INTO target USING tmp', bulk_threshold=3)
+
+        self.assertNotIn('MERGE INTO target USING tmp', self._executed())
+
+
+class TestSnowflakeClientRunMany(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SnowflakeClient(_credentials())
+        self.connection = FakeQueryConnection()
+        patcher = patch.object(self.client, '_dbapi_connection', return_value=self.connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_in_query_order_with_bounded_concurrency(self):
+        queries = ['SELECT 3', 'SELECT 1', 'SELECT 4', 'SELECT 2', 'SELECT 1']
+
+        results = self.client.run_many(queries, concurrency=2, poll_interval=0)
+
+        self.assertEqual(results, [[(3,)], [(1,)], [(4,)], [(2,)], [(1,)]])
+        self.assertEqual(self.connection.max_running, 2)
+
+    def test_return_exceptions_keeps_failed_queries_in_place(self):
+        results = self.client.run_many(['SELECT 2', 'FAIL 1', 'SELECT 1'], return_exceptions=True,
+                                       poll_interval=0)
+
+        self.assertEqual(results[0], [(2,)])
+        self.assertIsInstance(results[1], RuntimeError)
+        self.assertEqual(results[2], [(1,)])
+
+    def test_query_status_error_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.client.run_many(['SELECT 2', 'FAIL 1'], poll_interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO
+
+import pandas as pd
+
+from connectors import formats
+from connectors.local.local_sink import LocalFileSink
+from connectors.local.local_source import LocalFileSource
+
+
+class TestFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'col1': [1, 2, 3], 'col2': ['a', 'b', 'c']})
+
+    def _round_trip(self, data, file_format):
+        buffer = BytesIO()
+        formats.write(data, file_format, buffer)
+        buffer.seek(0)
+        return formats.read(buffer, file_format)
+
+    def test_infer_from_longest_extension(self):
+        """Test that compressed variants are matched before their inner format."""
+        self.assertEqual(formats.infer_file_format('data/file.csv'), 'csv')
+        self.assertEqual(formats.infer_file_format('data/file.ndjson.gz'), 'ndjson.gz')
+        self.assertEqual(formats.infer_file_format('data/file.csv.zst'), 'csv.zst')
+        self.assertEqual(formats.infer_file_format('data/file.feather'), 'arrow')
+        with self.assertRaises(ValueError):
+            formats.infer_file_format('data/file.txt')
+
+    def test_explicit_codec(self):
+        """Test that an explicit codec overrides the key's extension."""
+        self.assertEqual(formats.codec_for_key('data/file.csv', 'arrow-csv').name, 'arrow-csv')
+        with self.assertRaises(ValueError):
+            formats.codec_for_key('data/file.csv', 'missing')
+
+    def test_round_trip_frames(self):
+        """Test that every DataFrame codec reads back what it wrote."""
+        for file_format in ('csv', 'arrow-csv', 'parquet', 'arrow', 'csv.gz', 'parquet.zst', 'arrow.gz'):
+            with self.subTest(file_format=file_format):
+                pd.testing.assert_frame_equal(self._round_trip(self.df, file_format), self.df)
+
+    def test_round_trip_json(self):
+        """Test the JSON and NDJSON codecs, including compressed NDJSON."""
+        records = [{'col1': 1, 'col2': 'a'}, {'col1': 2, 'col2': 'b'}]
+        self.assertEqual(self._round_trip({'key': records}, 'json'), {'key': records})
+        for file_format in ('ndjson', 'ndjson.gz', 'ndjson.zst'):
+            with self.subTest(file_format=file_format):
+                pd.testing.assert_frame_equal(self._round_trip(records, file_format), pd.DataFrame(records))
+
+    def test_json_non_string_keys(self):
+        """Test that data orjson rejects still encodes through the stdlib encoder."""
+        self.assertEqual(self._round_trip({1: 'a'}, 'json'), {'1': 'a'})
+
+    def test_json_non_finite_numbers(self):
+        """Test that NaN and Infinity, which orjson rejects, still decode through the stdlib decoder."""
+        decoded = formats.read(BytesIO(b'{"score": NaN, "limit": Infinity}'), 'json')
+        self.assertTrue(pd.isna(decoded['score']))
+        self.assertEqual(decoded['limit'], float('inf'))
+
+    def test_ndjson_infers_dates(self):
+        """Test that NDJSON date-like columns are parsed as datetimes, as pandas' reader does."""
+        raw = b'{"id": 1, "created_at": "2024-01-01T00:00:00Z"}\n{"id": 2, "created_at": "2024-01-02T00:00:00Z"}'
+        df = formats.read(BytesIO(raw), 'ndjson')
+        self.assertEqual(str(df['created_at'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(df['id'].tolist(), [1, 2])
+
+    def test_codec_is_abstract(self):
+        """Test that a codec must implement read and write."""
+        class ReadOnlyCodec(formats.Codec):
+            def read(self, buffer):
+                return buffer.read()
+
+        with self.assertRaises(TypeError):
+            ReadOnlyCodec()
+
+    def test_unsupported_data_type(self):
+        """Test that codecs reject data they cannot encode."""
+        with self.assertRaises(TypeError):
+            formats.write({'col1': 1}, 'arrow.zst', BytesIO())
+
+    def test_register_codec(self):
+        """Test registering a custom codec and the duplicate-name check."""
+        class TextCodec(formats.Codec):
+            name = 'test-text'
+            extensions = ('.test-txt',)
+            content_type = 'text/plain'
+
+            def read(self, buffer):
+                return buffer.read().decode('utf-8')
+
+            def write(self, data, buffer):
+                buffer.write(data.encode('utf-8'))
+
+        formats.register_codec(TextCodec(), override=True)
+        self.assertEqual(formats.infer_file_format('notes.test-txt'), 'test-text')
+        self.assertEqual(self._round_trip('hello', 'test-text'), 'hello')
+        with self.assertRaises(ValueError):
+            formats.register_codec(TextCodec())
+
+    def test_local_files(self):
+        """Test compressed and Arrow codecs through the local file source and sink."""
+        with tempfile.TemporaryDirectory() as root_dir:
+            sink, source = LocalFileSink(root_dir), LocalFileSource(root_dir)
+            sink.load(self.df, 'out/file.parquet.zst')
+            sink.load(self.df, 'out/file.arrow')
+            sink.load(self.df, 'out/file.csv', codec='arrow-csv')
+
+            self.assertTrue(os.path.exists(os.path.join(root_dir, 'out', 'file.parquet.zst')))
+            pd.testing.assert_frame_equal(source.fetch('out/file.parquet.zst'), self.df)
+            pd.testing.assert_frame_equal(source.fetch('out/file.arrow'), self.df)
+            pd.testing.assert_frame_equal(source.fetch('out/file.csv', codec='arrow-csv'), self.df)
+
+
+if __name__ == '__main__':
+    unittest.main()
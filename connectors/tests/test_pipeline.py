@@ -0,0 +1,140 @@
+import threading
+import time
+import unittest
+from typing import List
+
+from connectors.pipeline import Pipeline
+from connectors.sink import Sink
+from connectors.source import Source
+
+
+class FakeSource(Source[int]):
+    def __init__(self, data: dict, delay: float = 0.0):
+        self.data = data
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, key: str) -> int:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return self.data[key]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def list(self, prefix: str = '') -> List[str]:
+        return [key for key in self.data if key.startswith(prefix)]
+
+
+class FakeSink(Sink[int]):
+    def __init__(self, fail_on=None):
+        self.loaded = {}
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def load(self, data: int, key: str):
+        if key == self.fail_on:
+            raise IOError(f"cannot write {key}")
+        with self._lock:
+            self.loaded[key] = data
+
+
+def double(value: int) -> int:
+    return value * 2
+
+
+def drop_odd(value: int):
+    return value if value % 2 == 0 else None
+
+
+def fail_on_ten(value: int) -> int:
+    if value == 10:
+        raise ValueError("bad record")
+    return value
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.source = FakeSource({f'in/{i}': i for i in range(50)})
+
+    def test_run_all_listed_keys(self):
+        sink = FakeSink()
+        pipeline = Pipeline(self.source, [double], sink, output_key=lambda key: key.replace('in/', 'out/'),
+                            batch_size=7)
+
+        stats = pipeline.run(prefix='in/')
+
+        self.assertEqual(sink.loaded, {f'out/{i}': i * 2 for i in range(50)})
+        self.assertEqual([stage.items for stage in stats.stages], [50, 50, 50])
+        self.assertEqual(stats.errors, [])
+        self.assertGreater(stats.wall_seconds, 0)
+
+    def test_transforms_chain_and_drop(self):
+        sink = FakeSink()
+        Pipeline(self.source, [drop_odd, double], sink).run(keys=['in/1', 'in/2', 'in/3', 'in/4'])
+        self.assertEqual(sink.loaded, {'in/2': 4, 'in/4': 8})
+
+    def test_errors_are_isolated_per_item(self):
+        sink = FakeSink(fail_on='in/20')
+        stats = Pipeline(self.source, [fail_on_ten], sink).run(keys=['in/5', 'in/10', 'in/20', 'in/missing'])
+
+        self.assertEqual(sink.loaded, {'in/5': 5})
+        self.assertEqual(sorted((stage, key) for stage, key, _ in stats.errors),
+                         [('fetch', 'in/missing'), ('load', 'in/20'), ('transform', 'in/10')])
+        self.assertEqual((stats.fetch.errors, stats.transform.errors, stats.load.errors), (1, 1, 1))
+
+    def test_output_key_errors_are_counted(self):
+        def bad_output_key(key: str) -> str:
+            raise KeyError(key)
+
+        stats = Pipeline(self.source, [], FakeSink(), output_key=bad_output_key, queue_size=1,
+                         load_workers=1).run(keys=['in/1', 'in/2', 'in/3'])
+
+        self.assertEqual((stats.load.items, stats.load.errors), (0, 3))
+        self.assertEqual(sorted(key for _, key, _ in stats.errors), ['in/1', 'in/2', 'in/3'])
+
+    def test_dispatch_errors_are_counted(self):
+        class BrokenPipeline(Pipeline):
+            def _make_executor(self):
+                executor = super()._make_executor()
+                executor.shutdown()  # submit() now raises
+                return executor
+
+        stats = BrokenPipeline(self.source, [double], FakeSink(), batch_size=2, queue_size=1).run()
+
+        self.assertEqual((stats.transform.items, stats.transform.errors), (0, 50))
+        self.assertEqual(stats.load.items, 0)
+
+    def test_process_executor(self):
+        sink = FakeSink()
+        stats = Pipeline(self.source, [double], sink, executor='process', transform_workers=2).run()
+        self.assertEqual(len(sink.loaded), 50)
+        self.assertEqual(stats.transform.items, 50)
+
+    def test_unpicklable_transform_fails_every_key(self):
+        stats = Pipeline(self.source, [lambda value: value], FakeSink(), executor='process', batch_size=7).run()
+
+        self.assertEqual((stats.transform.items, stats.transform.errors), (0, 50))
+        self.assertEqual(sorted(error[1] for error in stats.errors), sorted(f'in/{i}' for i in range(50)))
+        self.assertEqual(stats.load.items, 0)
+
+    def test_parallel_fetch_overlaps_latency(self):
+        source = FakeSource({str(i): i for i in range(20)}, delay=0.05)
+        stats = Pipeline(source, [], FakeSink(), fetch_workers=10).run()
+        self.assertEqual(stats.fetch.items, 20)
+        self.assertGreater(source.max_in_flight, 1)
+        self.assertLessEqual(source.max_in_flight, 10)
+
+    def test_invalid_executor(self):
+        with self.assertRaises(ValueError):
+            Pipeline(self.source, [], FakeSink(), executor='gpu')
+
+
+if __name__ == '__main__':
+    unittest.main()